@@ -2,17 +2,30 @@
 
 
 import streamlit as st
-import os
 import time
-import sqlite3
-import re
-import FinanceDataReader as fdr
-import yt_dlp
-import google.generativeai as genai
-import yfinance as yf
-import plotly.graph_objects as go
-import pandas as pd
-from duckduckgo_search import DDGS
+import queue
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from stock_core import configure
+from stock_core.charts import (
+    CHART_PERIODS, CHART_STYLES, MINI_CHART_MODE,
+    build_price_figure, get_fx_chart, get_mini_chart, get_sparkline_svg,
+)
+from stock_core.concurrency import coalesce
+from stock_core.frame_cache import get_frame_cache
+from stock_core.llm import get_analysis_cache
+from stock_core.news import stream_news_analysis
+from stock_core.prices import get_fx_data, get_mini_chart_data, get_stock_data
+from stock_core.recommend import StockPick, build_recommendation_snapshot, get_recommendation_snapshot
+from stock_core.symbols import (
+    detect_market, get_krx_refresh_info, get_ticker_from_db, get_us_ticker_by_name, validate_us_ticker,
+    initialize_database, initialize_us_database, krx_listing_ready, search_kr_stocks, us_master_ready,
+)
+from stock_core.upstream import UPSTREAM_LIMITS, get_upstream
+from stock_core.youtube import JOB_ACTIVE, get_video_job_queue
+
 
 
 # ==========================================
@@ -26,7 +39,7 @@ except:
     API_KEY = "내_실제_키_입력"
 
 
-genai.configure(api_key=API_KEY)
+configure(api_key=API_KEY)  # 실제 genai.configure 는 첫 AI 호출 때
 
 
 st.set_page_config(
@@ -48,9 +61,9 @@ defaults = {
     'news_links': None,
     'last_query': None,
     'page': '📊 주식 분석',
-    'rec_beginner': None,
-    'rec_expert': None,
+    'rec_error': None,
     'fx_period': '3mo',   # 환율 페이지 기간 선택 캐시
+    'news_prompt_stats': None,
 }
 for k, v in defaults.items():
     if k not in st.session_state:
@@ -58,444 +71,337 @@ for k, v in defaults.items():
 
 
 
-# ==========================================
-# 3. 시장 자동 감지
-# ==========================================
-def detect_market(query: str):
-    query = query.strip()
-    if re.fullmatch(r'[A-Z]{1,5}', query):
-        return 'US_TICKER', query.upper()
-    if re.fullmatch(r'[a-zA-Z\s\.\-&]+', query):
-        return 'US_NAME', query
-    return 'KR', query
+def job_owner() -> str:
+    """
+    영상 분석 작업 소유자 토큰 — 세션 ID 는 새로고침하면 바뀌므로 URL 쿼리 파라미터(?owner=...)에 둠
+    같은 주소로 새로고침·재접속하면 진행 중이던 작업과 결과가 그대로 보임
+    """
+    owner = st.query_params.get('owner')
+    if not owner:
+        owner = uuid.uuid4().hex
+        st.query_params['owner'] = owner
+    return owner
+
+
+job_owner()  # 첫 실행 때 주소에 토큰을 붙여 둠
 
 
 
 # ==========================================
-# 4. 국내 주식 DB
+# 3. 종목 DB 준비 (데이터 조회·AI 분석 로직은 stock_core 패키지)
 # ==========================================
-def initialize_database():
-    db_file = "stocks.db"
-    if not os.path.exists(db_file):
+def ensure_stock_database(market_type: str):
+    """최초 실행 시 종목 DB 구축을 스피너와 함께 먼저 수행 (이후 검색은 메모리 인덱스)"""
+    if market_type == 'US':
+        if not us_master_ready():
+            with st.spinner("📦 미국 종목 마스터를 구축 중입니다... (최초 1회 실행)"):
+                initialize_us_database()
+        return
+    if not krx_listing_ready():
         with st.spinner("📦 주식 DB를 구축 중입니다... (최초 1회 실행)"):
             try:
-                df_krx = fdr.StockListing('KRX')
-                conn = sqlite3.connect(db_file)
-                cursor = conn.cursor()
-                cursor.execute("DROP TABLE IF EXISTS stock_info")
-                cursor.execute("CREATE TABLE stock_info (code TEXT, name TEXT, market TEXT)")
-                for _, row in df_krx.iterrows():
-                    cursor.execute("INSERT INTO stock_info VALUES (?, ?, ?)",
-                                   (row['Code'], row['Name'], row['Market']))
-                conn.commit()
-                conn.close()
-                st.success(f"✅ DB 생성 완료! ({len(df_krx)}개 종목)")
+                stats = initialize_database()
+                st.success(f"✅ DB 생성 완료! ({stats['total']}개 종목)")
             except Exception as e:
                 st.error(f"DB 생성 실패: {e}")
 
 
 
-def get_ticker_from_db(stock_name: str):
-    initialize_database()
-    try:
-        db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stocks.db")
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT code, name, market FROM stock_info WHERE name LIKE ?",
-            (f"%{stock_name}%",)
-        )
-        results = cursor.fetchall()
-        conn.close()
-        if not results:
-            return None, None
-        best_match = min(results, key=lambda x: len(x[1]))
-        code, name, market = best_match
-        ticker = code + (".KS" if market == 'KOSPI' else ".KQ")
-        return ticker, name
-    except Exception:
-        return None, None
+# ==========================================
+# 12. 추천 카드 렌더링 헬퍼  ★ 신규: 미니 차트 포함
+# ==========================================
+def regenerate_recommendations():
+    """버튼 콜백: 캐시를 무시하고 추천 스냅샷을 새로 생성"""
+    with st.spinner("AI가 시장을 분석 중입니다..."):
+        try:
+            coalesce(('rec_snapshot', 'force'), build_recommendation_snapshot, force=True)
+            st.session_state['rec_error'] = None
+        except Exception as e:
+            st.session_state['rec_error'] = f"❌ AI 추천 생성 실패: {e}"
 
 
 
-# ==========================================
-# 5. 미국 주식 검색
-# ==========================================
-def get_us_ticker_by_name(company_name: str):
-    try:
-        search = yf.Search(company_name, max_results=5)
-        quotes = search.quotes
-        if not quotes:
-            return None, None
-        for q in quotes:
-            if q.get('quoteType', '').upper() in ('EQUITY', 'ETF'):
-                return q.get('symbol', ''), q.get('shortname') or q.get('longname') or company_name
-        q = quotes[0]
-        return q.get('symbol', ''), q.get('shortname', company_name)
-    except Exception:
-        return None, None
+def render_stock_cards(stock_list: list, chart_data: dict = None):
+    """
+    stock_list: [StockPick, ...]
+    chart_data: get_mini_chart_data 결과 (페이지에서 미리 받아둔 것)
+    각 아이템을 카드(border) + 미니 차트로 렌더링
+    """
+    # 미리 받아두지 못한 티커만 한 번에 추가 조회
+    chart_data = dict(chart_data or {})
+    missing = [s.ticker for s in stock_list if s.ticker and s.ticker not in chart_data]
+    if missing:
+        chart_data.update(get_mini_chart_data(missing))
 
 
+    kr_list = [s for s in stock_list if s.flag == '🇰🇷']
+    us_list = [s for s in stock_list if s.flag == '🇺🇸']
 
-def validate_us_ticker(ticker: str):
-    try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        name = info.get('shortName') or info.get('longName') or ticker
-        hist = stock.history(period="5d")
-        if hist.empty:
-            return None, None
-        return ticker, name
-    except Exception:
-        return None, None
 
+    for region_label, items in [("🇰🇷 국내", kr_list), ("🇺🇸 미국", us_list)]:
+        st.markdown(f"**{region_label}**")
+        cols = st.columns(3)
+        for i, s in enumerate(items[:3]):
+            with cols[i]:
+                render_stock_card(s, chart_data)
+        st.markdown("")
 
 
-# ==========================================
-# 6. 주가 데이터 조회
-# ==========================================
-def get_stock_data(ticker: str, period: str = "6mo"):
-    return yf.Ticker(ticker).history(period=period)
 
+def render_stock_card(s: StockPick, chart_data: dict):
+    """카드 1장 (border) + 미니 차트"""
+    with st.container(border=True):
+        # 상단: 종목 이름 + 티커
+        st.markdown(f"#### {s.flag} {s.name}")
+        st.caption(f"`{s.ticker}`")
 
 
-# ==========================================
-# 7. 환율 차트 (공용)  ★ 신규: JPY 지원
-# ==========================================
-def get_fx_chart(symbol: str, label: str, color: str, period: str = "3mo", height: int = 180):
-    """
-    symbol  : 'USDKRW=X' 또는 'JPYKRW=X'
-    label   : 호버·범례 이름
-    color   : 라인 색상 hex
-    period  : yfinance period 문자열 ('1mo','3mo','6mo','1y')
-    height  : 차트 높이 px
-    반환    : (fig, (현재환율, 전일대비변화, 변화율%))
-    """
-    try:
-        df = yf.Ticker(symbol).history(period=period)
-        if df.empty:
-            return None, None
-
-
-        current = df['Close'].iloc[-1]
-        prev    = df['Close'].iloc[-2]
-        change  = current - prev
-        chg_pct = (change / prev) * 100
-
-
-        r, g, b = int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
-
-
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df['Close'],
-            mode='lines',
-            line=dict(color=color, width=2),
-            fill='tozeroy',
-            fillcolor=f'rgba({r},{g},{b},0.08)',
-            name=label,
-            hovertemplate='%{x|%Y-%m-%d}<br>%{y:,.2f} 원<extra></extra>'
-        ))
-        fig.update_layout(
-            margin=dict(l=0, r=0, t=10, b=0),
-            height=height,
-            xaxis=dict(showgrid=False, tickformat='%m/%d'),
-            yaxis=dict(showgrid=True, gridcolor='rgba(200,200,200,0.15)'),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            showlegend=False,
-        )
-        return fig, (current, change, chg_pct)
-    except Exception:
-        return None, None
+        # 미니 차트 + 1개월 수익률
+        df_mini = chart_data.get(s.ticker)
+        chart, ret = None, None
+        if df_mini is not None:
+            if MINI_CHART_MODE == "svg":
+                chart, ret = get_sparkline_svg(df_mini)
+            else:
+                chart, ret = get_mini_chart(s.ticker, df=df_mini) or (None, None)
+        if chart:
+            if MINI_CHART_MODE == "svg":
+                st.markdown(chart, unsafe_allow_html=True)
+            else:
+                st.plotly_chart(chart, use_container_width=True, config={'displayModeBar': False})
+            ret_color = "🟢" if ret and ret >= 0 else "🔴"
+            st.caption(f"{ret_color} 1개월 수익률: **{ret:+.1f}%**" if ret is not None else "")
+        else:
+            st.caption("📊 차트 데이터 없음")
+
+
+        st.markdown("---")
+        # 설명 텍스트
+        st.markdown(f"💬 {s.desc}")
+        if s.reason:
+            st.markdown(f"✅ {s.reason}")
+        st.markdown(f"⚠️ 리스크: {s.risk}")
+        st.markdown(f"📊 난이도: {s.stars}")
 
 
 
 # ==========================================
-# 8. 추천 카드용 미니 차트
+# 12-1. 분석 페이지 패널 렌더링 + 병렬 조회
 # ==========================================
-def get_mini_chart(ticker: str, color: str = '#4c8ef7'):
-    """
-    1개월 종가 라인 차트 (카드 내 삽입용, 초소형)
-    """
-    try:
-        df = yf.Ticker(ticker).history(period="1mo")
-        if df.empty:
-            return None
-        # 수익률 색상: 상승=초록, 하락=빨강
-        start = df['Close'].iloc[0]
-        end   = df['Close'].iloc[-1]
-        line_color = '#26a65b' if end >= start else '#e74c3c'
-
-
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df.index, y=df['Close'],
-            mode='lines',
-            line=dict(color=line_color, width=1.5),
-            fill='tozeroy',
-            fillcolor=f'rgba({int(line_color[1:3],16)},{int(line_color[3:5],16)},{int(line_color[5:7],16)},0.1)',
-            hovertemplate='%{y:,.2f}<extra></extra>'
-        ))
-        fig.update_layout(
-            margin=dict(l=0, r=0, t=0, b=0),
-            height=80,
-            xaxis=dict(visible=False),
-            yaxis=dict(visible=False),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            showlegend=False,
-        )
-        ret = ((end - start) / start) * 100
-        return fig, ret
-    except Exception:
-        return None, None
+def session_thread_pool(max_workers: int):
+    """현재 세션의 ScriptRunContext 를 물려받는 스레드 풀 (워커 안에서 st.cache_* 사용 가능)"""
+    ctx = get_script_run_ctx()
+    return ThreadPoolExecutor(
+        max_workers=max_workers,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+    )
 
 
 
-# ==========================================
-# 9. AI 분석 함수
-# ==========================================
-def analyze_with_gemini(content_type: str, content_data, market_type: str = 'KR'):
-    try:
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
-
-
-        # ── 오디오 (유튜브) ──────────────────────────────
-        if content_type == "audio":
-            uploaded_file = genai.upload_file(content_data)
-            retry = 0
-            while uploaded_file.state.name == "PROCESSING":
-                time.sleep(1)
-                uploaded_file = genai.get_file(uploaded_file.name)
-                retry += 1
-                if retry > 60:
-                    return "❌ 파일 처리 시간 초과 (1분 경과)"
-            if uploaded_file.state.name == "FAILED":
-                return "❌ 구글 AI 처리 실패"
-            prompt = """
-            이 주식 관련 영상의 핵심 내용을 투자자 입장에서 한국어로 요약해줘.
-            양식:
-            ## 1. 📺 영상 핵심 3줄 요약
-            ## 2. 📈 매매 의견 (매수/매도/관망) 및 목표가
-            ## 3. 💡 주요 근거 및 포인트
-            """
-            response = model.generate_content([uploaded_file, prompt])
-            genai.delete_file(uploaded_file.name)
-            return response.text
+def render_price_panel(df, market_type: str, style: str = "캔들"):
+    if df is None or df.empty:
+        st.warning("차트 데이터 없음")
+        return
+    fig_stock, note = build_price_figure(df, style)
+    st.plotly_chart(fig_stock, use_container_width=True)
+    st.caption(note)
 
 
-        # ── 뉴스 텍스트 분석 ─────────────────────────────
-        elif content_type == "text":
-            if market_type == 'US':
-                prompt = f"""
-                다음은 미국 주식 관련 영문 뉴스 기사들입니다.
-                이를 한국어로 번역·종합하여 투자 리포트를 작성해줘.
-                [뉴스 데이터]\n{content_data}
-                양식:
-                ## 1. 📰 최신 뉴스 종합 3줄 요약 (한국어)
-                ## 2. 📈 시장의 종합적 의견 (매수/매도/관망)
-                ## 3. ⚠️ 주요 리스크 및 호재 요인
-                """
-            else:
-                prompt = f"""
-                다음 뉴스 기사들을 종합하여 투자 리포트를 작성해줘.
-                [뉴스 데이터]\n{content_data}
-                양식:
-                ## 1. 📰 최신 뉴스 종합 3줄 요약
-                ## 2. 📈 시장의 종합적 의견 (매수/매도/관망)
-                ## 3. ⚠️ 주요 리스크 및 호재 요인
-                """
-            return model.generate_content(prompt).text
-
-
-        # ── 추천 종목 생성 ───────────────────────────────
-        elif content_type == "recommend":
-            level = content_data  # 'beginner' or 'expert'
-            if level == 'beginner':
-                prompt = """
-                주식 투자 초보자에게 적합한 국내·미국 주식 각 3종목씩 총 6종목을 추천해줘.
-                기준: 변동성 낮음, 배당 안정적, 글로벌 브랜드 인지도 높음, 장기 보유 적합.
+    last_price = df['Close'].iloc[-1]
+    prev_price = df['Close'].iloc[-2]
+    delta = last_price - prev_price
+    if market_type == 'US':
+        st.metric("현재가", f"${last_price:,.2f}", f"{delta:+.2f}")
+    else:
+        st.metric("현재가", f"{last_price:,.0f}원", f"{delta:+,.0f}원")
 
 
-                반드시 아래 형식으로만 작성해줘. 다른 텍스트 없이 블록 6개만:
 
+def render_fx_context(fx_result):
+    """미국 주식 분석 시 참고용 달러 환율 (소형 차트)"""
+    fig_fx, fx_info = fx_result if fx_result else (None, None)
+    if not fig_fx or not fx_info:
+        return
+    rate, chg, chg_pct = fx_info
+    st.markdown("##### 💱 달러 환율 (USD/KRW)")
+    st.caption(f"현재 **{rate:,.2f} 원** ({chg:+.2f}원, {chg_pct:+.2f}%)")
+    st.plotly_chart(fig_fx, use_container_width=True, config={'displayModeBar': False})
 
-                ---
-                ### 🇰🇷 [종목명] ([티커])
-                **한 줄 요약:** 한 문장 설명
-                **추천 이유:** 구체적 이유 한 문장
-                **리스크:** 주의사항 한 문장
-                **난이도:** ⭐
-                ---
 
 
-                국내 3개(🇰🇷) 먼저, 미국 3개(🇺🇸) 이어서. 티커는 괄호 안에 정확히 표기.
-                """
-            else:
-                prompt = """
-                주식 고수(경험 많은 투자자)가 주목할 만한 국내·미국 주식 각 3종목씩 총 6종목을 추천해줘.
-                기준: 성장 모멘텀 강함, 기관/외국인 매수세, AI·반도체·바이오 테마 유망.
+def render_video_jobs(jobs: list):
+    """이 세션이 요청한 영상 분석 작업 (최신순)"""
+    for i, job in enumerate(jobs):
+        if job['status'] in JOB_ACTIVE:
+            st.info(f"🚀 영상 분석 중... {job['progress']}\n\n{job['url']}")
+        elif job['status'] == 'done':
+            with st.expander(f"🎬 영상 분석 결과 · {job['url']}", expanded=(i == 0)):
+                st.markdown(job['result'])
+        else:
+            st.error(f"❌ 분석 실패 · {job['url']}\n\n{job['error']}")
 
 
-                반드시 아래 형식으로만 작성해줘. 다른 텍스트 없이 블록 6개만:
 
+@st.fragment(run_every=2)
+def render_video_jobs_live():
+    """
+    진행 중인 작업이 있을 때만 2초마다 이 영역만 다시 그림
+    모두 끝나면 전체를 한 번 다시 실행해 폴링 없는 정적 목록으로 바꿈 (끝난 뒤 DB 조회 반복 방지)
+    """
+    video_jobs = get_video_job_queue().list_for(job_owner())
+    if not any(job['status'] in JOB_ACTIVE for job in video_jobs):
+        st.rerun()
+    render_video_jobs(video_jobs)
+
+
+
+def render_news_panel(news_text: str, news_links, prompt_stats: dict = None):
+    st.markdown(news_text)
+    if news_links:
+        with st.expander("📎 참고 기사 링크"):
+            for n in news_links:
+                st.markdown(f"- [{n['title']}]({n['href']})")
+            if prompt_stats:
+                st.caption(
+                    f"기사 {prompt_stats['articles_in']}건 중 중복 {prompt_stats['duplicates']}건 제외, "
+                    f"{prompt_stats['articles_used']}건 사용 · 프롬프트 약 {prompt_stats['prompt_tokens']:,} 토큰 "
+                    f"(원문 약 {prompt_stats['raw_tokens']:,} 토큰)"
+                )
 
-                ---
-                ### 🇰🇷 [종목명] ([티커])
-                **한 줄 요약:** 한 문장 설명
-                **추천 이유:** 구체적 이유 한 문장
-                **리스크:** 주의사항 한 문장
-                **난이도:** ⭐⭐⭐⭐
-                ---
 
 
-                국내 3개(🇰🇷) 먼저, 미국 3개(🇺🇸) 이어서. 티커는 괄호 안에 정확히 표기.
-                """
-            return model.generate_content(prompt).text
+# ── 분석 페이지 패널 (fragment): 패널 안의 상호작용은 그 패널만 다시 실행 ──
+def news_is_fresh(real_name: str) -> bool:
+    return (
+        st.session_state.get('news_result_text') is not None
+        and st.session_state.get('last_query') == real_name
+    )
 
 
-    except Exception as e:
-        return f"❌ AI 분석 중 에러 발생: {e}"
 
+def make_news_pump(news_box, news_queue: queue.Queue, future, real_name: str):
+    """
+    워커가 news_queue 로 보내는 리포트 조각을 news_box 에 이어 그리는 비차단 함수를 반환
+    pump() 는 지금까지 도착한 조각만 그리고 바로 돌아옴 (완료되면 True, 완성본은 세션에 저장)
+    → 차트 데이터를 기다리는 동안에도 호출해 두 패널이 각자 도착하는 대로 그려지게 함
+    """
+    news_box.info("⏳ 최신 뉴스를 분석 중입니다...")
+    done = False
 
 
-# ==========================================
-# 10. 뉴스 분석
-# ==========================================
-def get_news_analysis(keyword: str, market_type: str = 'KR'):
-    try:
-        q = f"{keyword} stock forecast analysis" if market_type == 'US' else f"{keyword} 주가 전망"
-        results = DDGS().text(q, max_results=5)
-        if not results:
-            return "❌ 검색된 뉴스가 없습니다.", None
-        news_text = "".join(
-            f"[{i+1}] {r['title']}\n{r['body']}\nLink: {r['href']}\n\n"
-            for i, r in enumerate(results)
-        )
-        return analyze_with_gemini("text", news_text, market_type), results
-    except Exception as e:
-        return f"❌ 뉴스 검색 오류: {e}", None
+    def pump() -> bool:
+        nonlocal done
+        while not done:
+            try:
+                msg = news_queue.get_nowait()
+            except queue.Empty:
+                done = future.done() and news_queue.empty()
+                return done
+            if msg[0] == 'chunk':
+                news_box.markdown(msg[1] + " ▌")
+                continue
+            _, news_result, news_links, prompt_stats = msg
+            st.session_state['news_result_text'] = news_result
+            st.session_state['news_links'] = news_links
+            st.session_state['news_prompt_stats'] = prompt_stats
+            st.session_state['last_query'] = real_name
+            done = True
+        return True
 
 
+    return pump
+
+
+
+def wait_pumping(future, pump=None):
+    """future 결과를 기다리는 동안 pump() 로 뉴스 스트림을 계속 그림 (pump 가 없거나 끝나면 그냥 대기)"""
+    while pump is not None and not future.done():
+        if pump():
+            break
+        time.sleep(0.1)
+    return future.result()
+
+
+
+@st.fragment
+def render_chart_fragment(ticker: str, market_type: str, prefetched=None):
+    """
+    주가 차트 열 — 기간·형태를 바꾸면 이 열만 다시 그림
+    prefetched: 전체 실행 때 페이지가 미리 시작한 (기간 라벨, 주가 future, 환율 future, 뉴스 pump)
+    """
+    st.subheader("📈 주가 차트")
+    period_col, style_col = st.columns([3, 2])
+    period_label = period_col.radio("기간", list(CHART_PERIODS), horizontal=True,
+                                    key="chart_period", label_visibility="collapsed")
+    chart_style = style_col.radio("형태", CHART_STYLES, horizontal=True,
+                                  key="chart_style", label_visibility="collapsed")
+    pre_period, price_future, fx_future, news_pump = prefetched or (None, None, None, None)
+
 
-# ==========================================
-# 11. 유튜브 다운로드
-# ==========================================
-def download_audio(youtube_url: str):
-    filename_base = "temp_audio_extra"
-    for ext in ['m4a', 'webm', 'mp3']:
-        fp = f"{filename_base}.{ext}"
-        if os.path.exists(fp):
-            os.remove(fp)
-    ydl_opts = {
-        'format': 'bestaudio[ext=m4a]/best',
-        'outtmpl': filename_base + '.%(ext)s',
-        'quiet': True,
-        'socket_timeout': 10,
-        'http_headers': {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
-    }
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(youtube_url, download=True)
-            return ydl.prepare_filename(info)
+        with st.spinner("⏳ 주가 데이터를 불러오는 중..."):
+            if price_future is not None and pre_period == period_label:
+                df = wait_pumping(price_future, news_pump)  # 형태만 바꾼 경우 등: 이미 받은 데이터 재사용
+            else:
+                df = get_stock_data(ticker, CHART_PERIODS[period_label])
     except Exception:
-        return None
-
+        df = None
+    render_price_panel(df, market_type, chart_style)
 
 
-# ==========================================
-# 12. 추천 카드 렌더링 헬퍼  ★ 신규: 미니 차트 포함
-# ==========================================
-def parse_ticker_from_block(block: str) -> str:
-    """블록 제목에서 (티커) 패턴 추출"""
-    m = re.search(r'\(([A-Z0-9\.\-]{1,10})\)', block)
-    return m.group(1) if m else None
+    if market_type == 'US':
+        try:
+            if fx_future is not None:
+                fx_result = wait_pumping(fx_future, news_pump)
+            else:
+                fx_result = get_fx_chart("USDKRW=X", "USD/KRW", "#f0a500")
+        except Exception:
+            fx_result = None
+        render_fx_context(fx_result)
 
 
 
-def render_stock_cards(stock_list: list):
+def finish_news_column(news_box, real_name: str, news_pump=None):
     """
-    stock_list: [{"flag","name","ticker","desc","reason","risk","stars"}, ...]
-    각 아이템을 카드(border) + 미니 차트로 렌더링
+    뉴스 리포트 열 마무리 — 남은 스트림을 끝까지 그린 뒤 완성본(또는 실패 안내)으로 교체
+    위젯이 없는 열이라 fragment 로 두지 않고, 차트 fragment 가 기다리는 동안 news_pump 로 먼저 그려짐
     """
-    kr_list = [s for s in stock_list if '🇰🇷' in s['flag']]
-    us_list = [s for s in stock_list if '🇺🇸' in s['flag']]
+    if news_pump is not None:
+        while not news_pump():
+            time.sleep(0.1)
+    if news_is_fresh(real_name):
+        with news_box.container():
+            render_news_panel(st.session_state['news_result_text'], st.session_state['news_links'],
+                              st.session_state.get('news_prompt_stats'))
+    else:
+        news_box.warning("뉴스 분석 결과를 가져오지 못했습니다. 잠시 후 다시 시도해주세요.")
 
 
-    for region_label, items in [("🇰🇷 국내", kr_list), ("🇺🇸 미국", us_list)]:
-        st.markdown(f"**{region_label}**")
-        cols = st.columns(3)
-        for i, s in enumerate(items[:3]):
-            with cols[i]:
-                with st.container(border=True):
-                    # 상단: 종목 이름 + 티커
-                    st.markdown(f"#### {s['flag']} {s['name']}")
-                    st.caption(f"`{s['ticker']}`")
-
-
-                    # 미니 차트 + 1개월 수익률
-                    fig_mini, ret = get_mini_chart(s['ticker'])
-                    if fig_mini:
-                        st.plotly_chart(fig_mini, use_container_width=True, config={'displayModeBar': False})
-                        ret_color = "🟢" if ret and ret >= 0 else "🔴"
-                        st.caption(f"{ret_color} 1개월 수익률: **{ret:+.1f}%**" if ret is not None else "")
-                    else:
-                        st.caption("📊 차트 데이터 없음")
-
-
-                    st.markdown("---")
-                    # 설명 텍스트
-                    st.markdown(f"💬 {s['desc']}")
-                    if s.get('reason'):
-                        st.markdown(f"✅ {s['reason']}")
-                    st.markdown(f"⚠️ 리스크: {s['risk']}")
-                    st.markdown(f"📊 난이도: {s['stars']}")
-        st.markdown("")
 
+@st.fragment
+def render_youtube_fragment(market_type: str):
+    """유튜브 분석 패널 — URL 입력·분석 버튼은 이 패널만 다시 실행 (차트·뉴스는 그대로)"""
+    st.markdown("---")
 
 
-def render_ai_recommendation_cards(ai_text: str):
-    """AI가 생성한 마크다운을 파싱 → 카드 + 미니 차트 렌더링"""
-    blocks = [b.strip() for b in ai_text.split('---') if b.strip()]
-
-
-    parsed = []
-    for block in blocks:
-        lines = [l.strip() for l in block.split('\n') if l.strip()]
-        item = {'flag': '🇺🇸', 'name': '', 'ticker': '', 'desc': '', 'reason': '', 'risk': '', 'stars': '⭐'}
-        for line in lines:
-            if line.startswith('### '):
-                title = line[4:]
-                if '🇰🇷' in title:
-                    item['flag'] = '🇰🇷'
-                elif '🇺🇸' in title:
-                    item['flag'] = '🇺🇸'
-                # 종목명 추출 (티커 앞까지)
-                name_part = re.sub(r'\([^)]+\)', '', title).replace('🇰🇷', '').replace('🇺🇸', '').strip()
-                item['name'] = name_part
-                # 티커 추출
-                tk = parse_ticker_from_block(title)
-                item['ticker'] = tk or ''
-            elif line.startswith('**한 줄 요약:**'):
-                item['desc'] = line.replace('**한 줄 요약:**', '').strip()
-            elif line.startswith('**추천 이유:**'):
-                item['reason'] = line.replace('**추천 이유:**', '').strip()
-            elif line.startswith('**리스크:**'):
-                item['risk'] = line.replace('**리스크:**', '').strip()
-            elif line.startswith('**난이도:**'):
-                item['stars'] = line.replace('**난이도:**', '').strip()
-        if item['name']:
-            parsed.append(item)
-
-
-    if not parsed:
-        st.markdown(ai_text)  # 파싱 실패 시 원문 표시
-        return
+    st.subheader("📺 유튜브 영상 심층 분석")
+    st.info("분석하고 싶은 영상의 링크를 입력하세요.")
+    youtube_url = st.text_input("유튜브 URL 붙여넣기", key="yt_url")
 
 
-    render_stock_cards(parsed)
+    if st.button("🎬 이 영상 분석하기"):
+        if youtube_url:
+            get_video_job_queue().submit(youtube_url, market_type, job_owner())
+            st.toast("🚀 영상 분석을 시작했습니다. 다른 작업을 계속하셔도 됩니다.")
+        else:
+            st.warning("링크를 입력해주세요.")
+
+
+    video_jobs = get_video_job_queue().list_for(job_owner())
+    if any(job['status'] in JOB_ACTIVE for job in video_jobs):
+        render_video_jobs_live()
+    else:
+        render_video_jobs(video_jobs)
 
 
 
@@ -520,6 +426,31 @@ with st.sidebar:
     st.markdown("---")
 
 
+    with st.expander("🗄️ 캐시 현황", expanded=False):
+        ai_stats = get_analysis_cache().stats()
+        st.caption(
+            f"**AI 분석 캐시** · 적중률 {ai_stats['hit_rate']:.0%} "
+            f"(hit {ai_stats['hits']} / miss {ai_stats['misses']})\n\n"
+            f"{ai_stats['entries']}건 · {ai_stats['bytes'] / 1024:,.0f} KB · 제거 {ai_stats['evictions']}건"
+        )
+        fc_stats = get_frame_cache().stats()
+        st.caption(
+            f"**가격 데이터 캐시** · 적중률 {fc_stats['hit_rate']:.0%} "
+            f"(hit {fc_stats['hits']} / miss {fc_stats['misses']})\n\n"
+            f"{fc_stats['entries']}건 · {fc_stats['bytes'] / 1024 ** 2:,.1f} / "
+            f"{fc_stats['max_bytes'] / 1024 ** 2:,.0f} MB · 제거 {fc_stats['evictions']}건 · 만료 {fc_stats['expired']}건"
+        )
+        state_icon = {'closed': '🟢', 'half_open': '🟡', 'open': '🔴'}
+        st.caption("**외부 API** (호출 · 대기 · 재시도 · 대체)")
+        for provider in UPSTREAM_LIMITS:
+            u = get_upstream(provider).snapshot()
+            st.caption(
+                f"{state_icon[u['state']]} {provider} · {u['calls']} · {u['throttled']} · "
+                f"{u['retries']} · {u['fallbacks']}"
+                + (f" (차단 {u['short_circuits']})" if u['short_circuits'] else '')
+            )
+
+
     if page == "📊 주식 분석":
         st.header("🔍 종목 검색")
         st.caption(
@@ -528,12 +459,23 @@ with st.sidebar:
             "**미국 회사명:** 영문 (Apple, Tesla)"
         )
         query = st.text_input("종목명 또는 티커", placeholder="예: 삼성전자 / AAPL")
+        try:
+            refreshed_at, refresh_stats = get_krx_refresh_info()
+        except Exception:
+            refreshed_at, refresh_stats = None, None
+        if refreshed_at:
+            st.caption(
+                f"📦 국내 종목 DB 갱신: {time.strftime('%Y-%m-%d %H:%M', time.localtime(refreshed_at))} "
+                f"(신규 {refresh_stats.get('added', 0)} · 상장폐지 {refresh_stats.get('removed', 0)} "
+                f"· 변경 {refresh_stats.get('changed', 0)})"
+            )
 
 
         if st.button("🔎 뉴스 분석 시작", use_container_width=True):
             if query:
                 market_guess, clean_query = detect_market(query)
                 ticker, real_name, market_type = None, None, 'KR'
+                ensure_stock_database('KR' if market_guess == 'KR' else 'US')
 
 
                 if market_guess == 'US_TICKER':
@@ -558,12 +500,18 @@ with st.sidebar:
                         'market_type': market_type,
                         'news_result_text': None,
                         'news_links': None,
+                        'news_prompt_stats': None,
                         'last_query': None,
                     })
                     flag = "🇺🇸" if market_type == 'US' else "🇰🇷"
                     st.success(f"{flag} **{real_name}** ({ticker})")
                 else:
                     st.error("종목을 찾을 수 없습니다.")
+                    if market_type == 'KR':
+                        # 확정할 만큼 비슷하지 않은 후보는 고를 수 있게 보여주기만 함
+                        similar = search_kr_stocks(clean_query, limit=5)
+                        if similar:
+                            st.caption("비슷한 종목: " + ", ".join(f"{n} ({t})" for t, n, _, _ in similar))
                     st.session_state['analyzed'] = False
             else:
                 st.warning("종목명을 입력해주세요.")
@@ -591,87 +539,33 @@ if st.session_state['page'] == "📊 주식 분석":
         col_left, col_right = st.columns([1.2, 2])
 
 
-        # ── 왼쪽: 주가 차트 + 환율 차트 ──────────────────────
-        with col_left:
-            # 주가 캔들 차트
-            st.subheader("📈 주가 차트 (6개월)")
-            df = get_stock_data(ticker)
-            if not df.empty:
-                fig_stock = go.Figure(data=[go.Candlestick(
-                    x=df.index,
-                    open=df['Open'], high=df['High'],
-                    low=df['Low'],   close=df['Close']
-                )])
-                fig_stock.update_layout(xaxis_rangeslider_visible=False, height=340)
-                st.plotly_chart(fig_stock, use_container_width=True)
-
-
-                last_price = df['Close'].iloc[-1]
-                prev_price = df['Close'].iloc[-2]
-                delta = last_price - prev_price
-                if market_type == 'US':
-                    st.metric("현재가", f"${last_price:,.2f}", f"{delta:+.2f}")
-                else:
-                    st.metric("현재가", f"{last_price:,.0f}원", f"{delta:+,.0f}원")
-            else:
-                st.warning("차트 데이터 없음")
-
-
-        # ── 오른쪽: 뉴스 분석 + 유튜브 분석 ─────────────────
-        with col_right:
-            st.subheader("📰 AI 뉴스 분석 리포트")
-
-
-            if (
-                st.session_state.get('news_result_text') is None
-                or st.session_state.get('last_query') != real_name
-            ):
-                with st.spinner("최신 뉴스를 분석 중입니다..."):
-                    news_result, news_links = get_news_analysis(real_name, market_type)
-                    st.session_state['news_result_text'] = news_result
-                    st.session_state['news_links'] = news_links
-                    st.session_state['last_query'] = real_name
-
-
-            st.markdown(st.session_state['news_result_text'])
-
-
-            if st.session_state.get('news_links'):
-                with st.expander("📎 참고 기사 링크"):
-                    for n in st.session_state['news_links']:
-                        st.markdown(f"- [{n['title']}]({n['href']})")
+        # ── 전체 실행 때: 주가 / 환율 / 뉴스 조회를 동시에 시작하고 각 패널(fragment)이 결과를 받아 그림 ──
+        # 이후 패널 안의 상호작용은 해당 fragment 만 다시 실행되어 다른 패널을 다시 조회하지 않음
+        period_label = st.session_state.get('chart_period', next(iter(CHART_PERIODS)))
+        with session_thread_pool(max_workers=3) as pool:
+            price_future = pool.submit(get_stock_data, ticker, CHART_PERIODS[period_label])
+            fx_future = None
+            if market_type == 'US':
+                fx_future = pool.submit(get_fx_chart, "USDKRW=X", "USD/KRW", "#f0a500")
+            with col_right:
+                st.subheader("📰 AI 뉴스 분석 리포트")
+                news_box = st.empty()
+            news_pump = None
+            if not news_is_fresh(real_name):
+                news_queue = queue.Queue()
+                news_future = pool.submit(stream_news_analysis, real_name, market_type, news_queue, ticker)
+                news_pump = make_news_pump(news_box, news_queue, news_future, real_name)
 
 
-            st.markdown("---")
+            # 차트 fragment 는 주가·환율을 기다리는 동안 news_pump 로 뉴스 조각을 계속 그림
+            with col_left:
+                render_chart_fragment(ticker, market_type, (period_label, price_future, fx_future, news_pump))
+            finish_news_column(news_box, real_name, news_pump)
 
 
-            st.subheader("📺 유튜브 영상 심층 분석")
-            st.info("분석하고 싶은 영상의 링크를 입력하세요.")
-            youtube_url = st.text_input("유튜브 URL 붙여넣기", key="yt_url")
-
-
-            if st.button("🎬 이 영상 분석하기"):
-                if youtube_url:
-                    with st.status("🚀 영상 분석 중...", expanded=True) as status:
-                        status.write("1️⃣ 오디오 다운로드 중...")
-                        audio_file = download_audio(youtube_url)
-                        if audio_file:
-                            status.write("2️⃣ AI가 내용을 분석 중...")
-                            video_result = analyze_with_gemini("audio", audio_file, market_type)
-                            if "에러" not in video_result:
-                                status.update(label="✅ 분석 완료!", state="complete")
-                                st.markdown("### 🎬 영상 분석 결과")
-                                st.markdown(video_result)
-                            else:
-                                status.update(label="❌ 분석 실패", state="error")
-                                st.error(video_result)
-                            if os.path.exists(audio_file):
-                                os.remove(audio_file)
-                        else:
-                            status.update(label="❌ 다운로드 실패", state="error")
-                            st.error("영상을 다운로드할 수 없습니다. (링크 확인 필요)")
-                else:
-                    st.warning("링크를 입력해주세요.")
+        # ── 오른쪽 하단: 유튜브 분석 ─────────────────────────
+        with col_right:
+            render_youtube_fragment(market_type)
 
 
     else:
@@ -733,7 +627,7 @@ elif st.session_state['page'] == "💱 환율":
                           f"{chg:+.2f}원 ({chg_pct:+.2f}%)")
             with m2:
                 # 기간 내 최고가
-                df_usd = yf.Ticker("USDKRW=X").history(period=selected_period)
+                df_usd = get_fx_data("USDKRW=X", selected_period)
                 st.metric(f"📈 {period_choice} 최고", f"{df_usd['High'].max():,.2f} 원")
             with m3:
                 st.metric(f"📉 {period_choice} 최저", f"{df_usd['Low'].min():,.2f} 원")
@@ -772,7 +666,7 @@ elif st.session_state['page'] == "💱 환율":
                 st.metric("¥ 현재 엔화 환율 (100엔)", f"{rate100:,.2f} 원",
                           f"{chg100:+.2f}원 ({chg_pct:+.2f}%)")
             with m2:
-                df_jpy = yf.Ticker("JPYKRW=X").history(period=selected_period)
+                df_jpy = get_fx_data("JPYKRW=X", selected_period)
                 st.metric(f"📈 {period_choice} 최고 (100엔)", f"{df_jpy['High'].max()*100:,.2f} 원")
             with m3:
                 st.metric(f"📉 {period_choice} 최저 (100엔)", f"{df_jpy['Low'].min()*100:,.2f} 원")
@@ -867,54 +761,65 @@ elif st.session_state['page'] == "⭐ 추천 종목":
     ]
 
 
-    # ── 탭 1: 초보자 ──────────────────────────────────────
-    with tab_beginner:
-        st.markdown("#### 🌱 처음 투자를 시작하는 분들을 위한 안정적인 종목")
-        st.caption("✅ 변동성 낮음 · 배당 안정 · 장기 보유 적합 · 글로벌 브랜드")
-        st.markdown("---")
-        st.markdown("##### 📋 기본 추천 리스트")
-
-
-        render_stock_cards(default_beginner)
-
-
-        st.markdown("---")
-        st.markdown("##### 🤖 AI 실시간 추천 (현재 트렌드 기반)")
-        st.caption("버튼을 클릭하면 AI가 오늘의 시장 상황을 반영해 종목을 추천합니다.")
+    default_beginner = [StockPick(**d) for d in default_beginner]
+    default_expert   = [StockPick(**d) for d in default_expert]
 
 
-        if st.button("✨ AI에게 초보자 추천 종목 받기", use_container_width=True, key="ai_begin"):
-            with st.spinner("AI가 시장을 분석 중입니다..."):
-                st.session_state['rec_beginner'] = analyze_with_gemini("recommend", "beginner")
+    # ── 오늘의 AI 추천 스냅샷 (차트 데이터 포함) ──────────
+    # 버튼 재생성 실패 메시지는 직후 화면에 한 번만 표시, 자동 생성 실패는 매 실행마다 새로 판단
+    rec_error = st.session_state['rec_error']
+    st.session_state['rec_error'] = None
+    try:
+        with st.spinner("🤖 오늘의 AI 추천을 준비 중입니다..."):
+            rec_snapshot = get_recommendation_snapshot()
+    except Exception as e:
+        rec_snapshot = None
+        rec_error = rec_error or f"❌ AI 추천 생성 실패: {e}"
 
 
-        if st.session_state.get('rec_beginner'):
-            render_ai_recommendation_cards(st.session_state['rec_beginner'])
+    # ── 미니 차트 데이터 일괄 조회 (기본 목록만, AI 추천은 스냅샷에 포함) ──
+    with st.spinner("📊 차트 데이터를 불러오는 중..."):
+        mini_chart_data = get_mini_chart_data([s.ticker for s in default_beginner + default_expert])
+    if rec_snapshot:
+        mini_chart_data.update(rec_snapshot['charts'])
 
 
-    # ── 탭 2: 고수 ────────────────────────────────────────
-    with tab_expert:
-        st.markdown("#### 🔥 경험 많은 투자자를 위한 성장·모멘텀 종목")
-        st.caption("📈 성장 모멘텀 · 기관 매수세 · AI·반도체·바이오 핵심 테마")
-        st.markdown("---")
-        st.markdown("##### 📋 기본 추천 리스트")
+    for tab, level, label, defaults_list, btn_key in (
+        (tab_beginner, 'beginner', '초보자', default_beginner, 'ai_begin'),
+        (tab_expert,   'expert',   '고수',   default_expert,   'ai_expert'),
+    ):
+        with tab:
+            if level == 'beginner':
+                st.markdown("#### 🌱 처음 투자를 시작하는 분들을 위한 안정적인 종목")
+                st.caption("✅ 변동성 낮음 · 배당 안정 · 장기 보유 적합 · 글로벌 브랜드")
+            else:
+                st.markdown("#### 🔥 경험 많은 투자자를 위한 성장·모멘텀 종목")
+                st.caption("📈 성장 모멘텀 · 기관 매수세 · AI·반도체·바이오 핵심 테마")
+            st.markdown("---")
+            st.markdown("##### 📋 기본 추천 리스트")
 
 
-        render_stock_cards(default_expert)
+            render_stock_cards(defaults_list, mini_chart_data)
 
 
-        st.markdown("---")
-        st.markdown("##### 🤖 AI 실시간 추천 (현재 트렌드 기반)")
-        st.caption("버튼을 클릭하면 AI가 오늘의 시장 상황을 반영해 종목을 추천합니다.")
+            st.markdown("---")
+            st.markdown("##### 🤖 AI 오늘의 추천 (현재 트렌드 기반)")
+            if rec_snapshot:
+                st.caption(
+                    f"{rec_snapshot['trading_day']} 거래일 기준 · "
+                    f"{time.strftime('%m/%d %H:%M', time.localtime(rec_snapshot['created_at']))} 생성"
+                )
 
 
-        if st.button("✨ AI에게 고수 추천 종목 받기", use_container_width=True, key="ai_expert"):
-            with st.spinner("AI가 시장을 분석 중입니다..."):
-                st.session_state['rec_expert'] = analyze_with_gemini("recommend", "expert")
+            # 초보자·고수 목록을 한 번에 생성하므로 어느 탭의 버튼이든 두 탭이 함께 갱신됨
+            st.button(f"🔄 AI에게 {label} 추천 종목 새로 받기", use_container_width=True, key=btn_key,
+                      on_click=regenerate_recommendations)
 
 
-        if st.session_state.get('rec_expert'):
-            render_ai_recommendation_cards(st.session_state['rec_expert'])
+            if rec_error:
+                st.error(rec_error)
+            if rec_snapshot:
+                render_stock_cards(rec_snapshot[level], mini_chart_data)
 
 
     # 면책 고지
@@ -0,0 +1,9 @@
+"""
+AI 주식 애널리스트 핵심 라이브러리 (데이터 조회 · AI 분석 · 작업 큐)
+
+Streamlit 화면(app.py)과 분리되어 워커·배치·벤치마크에서 바로 import 할 수 있음
+- import 시 부작용 없음: API 설정·DB 생성·스레드 시작은 모두 처음 호출할 때
+- 무거운 외부 라이브러리(pandas, yfinance, plotly, google.generativeai, yt_dlp ...)는
+  lazy.lazy_import 로 처음 사용할 때 로드
+"""
+from .config import configure
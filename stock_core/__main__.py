@@ -0,0 +1,49 @@
+"""
+배치·측정 명령
+  python -m stock_core build-recommendations        거래일 추천 스냅샷 생성 (cron 등에서 거래일마다 실행)
+  python -m stock_core bench-llm [요청 수] [동시 수]  가짜 LLM 으로 분석 파이프라인 처리량 측정
+  python -m stock_core bench-startup [반복 수] [app.py ...]
+                                                    경로별 import + 첫 사용 시간, 앱 첫 화면 렌더까지 시간
+"""
+import logging
+import sys
+
+
+
+def main(argv: list) -> int:
+    command, args = (argv[0], [int(a) for a in argv[1:] if a.isdigit()]) if argv else (None, [])
+
+
+    if command == "build-recommendations":
+        from .recommend import build_recommendation_snapshot
+        logging.basicConfig(level=logging.INFO)
+        snap = build_recommendation_snapshot(force=True)
+        print(f"✅ {snap['trading_day']} 추천 스냅샷 저장 완료 "
+              f"(초보자 {len(snap['beginner'])} · 고수 {len(snap['expert'])} 종목, 차트 {len(snap['charts'])}개)")
+        return 0
+
+
+    if command == "bench-llm":
+        from .bench import run_llm_benchmark
+        from .llm import FAKE_LLM_LATENCY, FAKE_LLM_UPLOAD
+        report = run_llm_benchmark(*args[:2])
+        print(f"가짜 LLM 지연 {FAKE_LLM_LATENCY}s · 업로드 {FAKE_LLM_UPLOAD}s")
+        for name, r in report.items():
+            print(f"{name:>6}: " + " · ".join(f"{k}={v}" for k, v in r.items()))
+        return 0
+
+
+    if command == "bench-startup":
+        from .bench import run_startup_benchmark
+        app_paths = [a for a in argv[1:] if a.endswith(".py")]
+        for name, r in run_startup_benchmark(*args[:1], app_paths=app_paths).items():
+            print(f"{name:>8}: " + " · ".join(f"{k}={v}" for k, v in r.items()))
+        return 0
+
+
+    print(__doc__)
+    return 2
+
+
+
+sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,176 @@
+"""
+성능 측정 (네트워크 호출 없음)
+- run_llm_benchmark : 가짜 LLM 으로 분석 파이프라인의 처리량·지연·동시성 측정
+- run_startup_benchmark : 새 프로세스에서 경로별 import + 첫 사용, 앱 첫 화면 렌더까지 시간 측정
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from . import llm as llm_core
+from .llm import analyze_with_gemini, generate_text_stream, get_analysis_cache, get_llm_provider
+from .youtube import analyze_audio_segments
+
+
+
+def _run_case(llm, job, requests: int, workers: int) -> dict:
+    """job(i) 를 workers 동시로 requests 번 실행. job 이 값을 돌려주면 '첫 조각까지 시간'으로 집계"""
+    llm.stats['max_in_flight'] = 0
+    latencies, firsts = [], []
+
+
+    def timed(i):
+        started = time.perf_counter()
+        first = job(i)
+        latencies.append(time.perf_counter() - started)
+        if first is not None:
+            firsts.append(first)
+
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(timed, range(requests)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    result = {
+        'requests':      requests,
+        'wall_sec':      round(wall, 3),
+        'throughput':    round(requests / wall, 2),
+        'p50_sec':       round(latencies[len(latencies) // 2], 3),
+        'p95_sec':       round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 3),
+        'max_in_flight': llm.stats['max_in_flight'],
+    }
+    if firsts:
+        result['first_chunk_p50_sec'] = round(sorted(firsts)[len(firsts) // 2], 3)
+    return result
+
+
+
+def run_llm_benchmark(requests: int = 40, workers: int = 8) -> dict:
+    """
+    가짜 LLM(FAKE_LLM_LATENCY) + 임시 AI 캐시로 분석 경로별 처리량·지연 측정
+    text: 뉴스 분석 / stream: 스트리밍(첫 조각까지 시간 포함) / audio: 4구간 영상 분석(업로드·종합 포함)
+    가짜 제공자는 각 경로에 직접 넘김 — LLM_PROVIDER 설정·공용 제공자(get_llm_provider())는 건드리지 않음
+    """
+    saved_cache_path = llm_core.AI_CACHE_DB_PATH
+    llm = get_llm_provider('fake')
+    run_id = uuid.uuid4().hex[:8]  # 매번 다른 프롬프트 → 캐시 적중 없이 측정
+
+
+    def text_job(i):
+        result = analyze_with_gemini("text", f"bench {run_id} #{i}", llm=llm)
+        if result.startswith("❌"):
+            raise RuntimeError(result)
+        return None
+
+
+    def stream_job(i):
+        started, first = time.perf_counter(), None
+        for _ in generate_text_stream(llm, f"bench stream {run_id} #{i}"):
+            first = first or time.perf_counter() - started
+        return first
+
+
+    def audio_job(i):
+        segments = []
+        for n in range(4):
+            path = os.path.join(work_dir, f"{i}_{n}.m4a")
+            with open(path, 'wb') as f:
+                f.write(f"{run_id}-{i}-{n}".encode() * 256)
+            segments.append(path)
+        result = analyze_audio_segments(segments, llm=llm)
+        if result.startswith("❌"):
+            raise RuntimeError(result)
+        return None
+
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        llm_core.AI_CACHE_DB_PATH = os.path.join(work_dir, "bench_cache.db")
+        get_analysis_cache.clear()
+        try:
+            return {
+                'text':   _run_case(llm, text_job, requests, workers),
+                'stream': _run_case(llm, stream_job, requests, workers),
+                'audio':  _run_case(llm, audio_job, max(requests // 4, 1), workers),
+            }
+        finally:
+            llm_core.AI_CACHE_DB_PATH = saved_cache_path
+            get_analysis_cache.clear()
+
+
+
+# 콜드 스타트 비교: 케이스마다 새 파이썬 프로세스에서 측정
+# 지연 import 는 무거운 라이브러리 비용을 없애지 않고 "처음 쓰는 시점"으로 옮기므로,
+# 모듈 import 만이 아니라 경로별 import + 첫 사용 시간을 함께 잼 (네트워크 호출 없음)
+_CORE_IMPORT = ("import stock_core.symbols, stock_core.prices, stock_core.charts, stock_core.llm, "
+                "stock_core.news, stock_core.youtube, stock_core.recommend")
+STARTUP_CASES = {
+    # 핵심 모듈 전체 import (무거운 라이브러리는 아직 로드되지 않음)
+    'core':    _CORE_IMPORT,
+    # 주가 차트 경로: pandas · numpy · plotly 로드 + 300봉 캔들 Figure 생성
+    'chart':   _CORE_IMPORT + "; from stock_core import charts; "
+               "df = charts.pd.DataFrame({c: [1.0 + i % 7 for i in range(300)] "
+               "for c in ('Open', 'High', 'Low', 'Close', 'Volume')}, "
+               "index=charts.pd.date_range('2024-01-01', periods=300)); "
+               "charts.build_price_figure(df, '캔들')",
+    # 종목 검색·시세 경로: FinanceDataReader · yfinance 로드
+    'symbols': _CORE_IMPORT + "; from stock_core import symbols; symbols.fdr.StockListing; symbols.yf.Ticker",
+    # AI 분석 경로: google.generativeai 로드 + 모델 객체 생성
+    'llm':     _CORE_IMPORT + "; from stock_core.llm import get_llm_provider; get_llm_provider('gemini')",
+    # 뉴스 · 유튜브 경로
+    'news':    _CORE_IMPORT + "; from stock_core import news; news.ddgs.DDGS",
+    'youtube': _CORE_IMPORT + "; from stock_core import youtube; youtube.yt_dlp.YoutubeDL",
+    # 분리 전 app.py 가 실행될 때마다 최상단에서 import 하던 라이브러리 전부
+    'eager':   "import FinanceDataReader, yt_dlp, google.generativeai, yfinance, "
+               "plotly.graph_objects, pandas, numpy, duckduckgo_search",
+}
+
+
+# 앱 시작 → 첫 화면(종목 미선택 분석 페이지) 렌더 완료까지: streamlit import 포함, AppTest 로 실행
+_APP_STARTUP_CODE = """
+import sys, time
+t = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+if at.exception:
+    raise SystemExit(at.exception[0].value)
+print(time.perf_counter() - t)
+"""
+
+
+
+def _time_runs(argv: list, runs: int, env: dict = None) -> dict:
+    """argv 를 새 프로세스로 runs 번 실행 → 출력된 초의 중앙값·최솟값. 실패 시 오류 메시지"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    times = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-W", "ignore", *argv], cwd=root, env=env,
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {'error': (proc.stderr.strip().splitlines() or ['?'])[-1]}
+        times.append(float(proc.stdout.strip().splitlines()[-1]))
+    return {'median_sec': round(statistics.median(times), 3), 'min_sec': round(min(times), 3), 'runs': runs}
+
+
+
+def run_startup_benchmark(runs: int = 5, app_paths: list = ()) -> dict:
+    """
+    STARTUP_CASES 별 import(+첫 사용) 시간, app_paths 의 각 앱은 첫 화면 렌더까지 시간
+    앱은 임시 데이터 폴더(STOCK_AI_DATA_DIR)에서 실행해 실제 DB 를 건드리지 않음 (종목 DB 는 초기 목록에서 복사됨)
+    """
+    report = {}
+    for name, stmt in STARTUP_CASES.items():
+        code = f"import time; t = time.perf_counter(); {stmt}; print(time.perf_counter() - t)"
+        report[name] = _time_runs(["-c", code], runs)
+
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = {**os.environ, 'STOCK_AI_DATA_DIR': data_dir}
+        for path in app_paths:
+            report[f"app:{path}"] = _time_runs(["-c", _APP_STARTUP_CODE, os.path.abspath(path)], runs, env)
+    return report
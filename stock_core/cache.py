@@ -0,0 +1,67 @@
+"""프로세스 전역 캐시 데코레이터 (Streamlit 없이도 동작하는 st.cache_resource / st.cache_data 대응)"""
+import copy
+import functools
+import threading
+import time
+
+
+
+def resource_cache(fn):
+    """
+    인자별로 한 번만 만들어 프로세스 전체가 공유 (스레드·DB 연결 보유 객체용)
+    동시에 처음 호출돼도 생성은 한 번만 실행됨. fn.clear() 로 비움
+    """
+    lock = threading.Lock()
+    store = {}
+
+
+    @functools.wraps(fn)
+    def wrapper(*args):
+        try:
+            return store[args]
+        except KeyError:
+            pass
+        with lock:
+            if args not in store:
+                store[args] = fn(*args)
+            return store[args]
+
+
+    wrapper.clear = store.clear
+    return wrapper
+
+
+
+def ttl_cache(ttl: float, max_entries: int = 256):
+    """
+    인자별 결과를 ttl 초 동안 재사용. 예외는 캐시하지 않음. fn.clear() 로 비움
+    - 저장할 때 만료 항목을 지우고, max_entries 를 넘으면 가장 오래된 항목부터 제거
+    - st.cache_data 처럼 호출마다 사본을 돌려줘 호출자가 결과를 고쳐도 캐시는 그대로
+    """
+    def decorator(fn):
+        lock = threading.Lock()
+        store = {}   # key → (저장 시각, 값), 저장 순서 = 오래된 순
+
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            with lock:
+                hit = store.get(key)
+            if hit is not None and time.monotonic() - hit[0] < ttl:
+                return copy.deepcopy(hit[1])
+            value = fn(*args, **kwargs)
+            now = time.monotonic()
+            with lock:
+                for k in [k for k, (t, _) in store.items() if now - t >= ttl]:
+                    del store[k]
+                store.pop(key, None)
+                store[key] = (now, copy.deepcopy(value))
+                while len(store) > max_entries:
+                    del store[next(iter(store))]
+            return value
+
+
+        wrapper.clear = store.clear
+        return wrapper
+    return decorator
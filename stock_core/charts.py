@@ -0,0 +1,219 @@
+"""Plotly 차트·SVG 스파크라인 생성 (Streamlit 에 그리는 일은 app.py 가 담당)"""
+from __future__ import annotations
+
+from .lazy import lazy_import
+from .prices import get_fx_data, get_mini_chart_data
+
+go = lazy_import("plotly.graph_objects")
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+
+# ── 환율 차트 ──────────────────────────────────
+def get_fx_chart(symbol: str, label: str, color: str, period: str = "3mo", height: int = 180):
+    """
+    symbol  : 'USDKRW=X' 또는 'JPYKRW=X'
+    label   : 호버·범례 이름
+    color   : 라인 색상 hex
+    period  : yfinance period 문자열 ('1mo','3mo','6mo','1y')
+    height  : 차트 높이 px
+    반환    : (fig, (현재환율, 전일대비변화, 변화율%))
+    """
+    try:
+        df = get_fx_data(symbol, period)
+        if df.empty:
+            return None, None
+
+
+        current = df['Close'].iloc[-1]
+        prev    = df['Close'].iloc[-2]
+        change  = current - prev
+        chg_pct = (change / prev) * 100
+
+
+        r, g, b = int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=df.index,
+            y=df['Close'],
+            mode='lines',
+            line=dict(color=color, width=2),
+            fill='tozeroy',
+            fillcolor=f'rgba({r},{g},{b},0.08)',
+            name=label,
+            hovertemplate='%{x|%Y-%m-%d}<br>%{y:,.2f} 원<extra></extra>'
+        ))
+        fig.update_layout(
+            margin=dict(l=0, r=0, t=10, b=0),
+            height=height,
+            xaxis=dict(showgrid=False, tickformat='%m/%d'),
+            yaxis=dict(showgrid=True, gridcolor='rgba(200,200,200,0.15)'),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            showlegend=False,
+        )
+        return fig, (current, change, chg_pct)
+    except Exception:
+        return None, None
+
+
+
+# ── 추천 카드용 미니 차트 ────────────────────────
+def get_mini_chart(ticker: str, color: str = '#4c8ef7', df: pd.DataFrame = None):
+    """
+    1개월 종가 라인 차트 (카드 내 삽입용, 초소형)
+    df 를 넘기면 (배치 조회 결과) 추가 다운로드 없이 그대로 사용
+    """
+    try:
+        if df is None:
+            df = get_mini_chart_data([ticker]).get(ticker)
+        if df is None or df.empty:
+            return None
+        # 수익률 색상: 상승=초록, 하락=빨강
+        start = df['Close'].iloc[0]
+        end   = df['Close'].iloc[-1]
+        line_color = '#26a65b' if end >= start else '#e74c3c'
+
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=df.index, y=df['Close'],
+            mode='lines',
+            line=dict(color=line_color, width=1.5),
+            fill='tozeroy',
+            fillcolor=f'rgba({int(line_color[1:3],16)},{int(line_color[3:5],16)},{int(line_color[5:7],16)},0.1)',
+            hovertemplate='%{y:,.2f}<extra></extra>'
+        ))
+        fig.update_layout(
+            margin=dict(l=0, r=0, t=0, b=0),
+            height=80,
+            xaxis=dict(visible=False),
+            yaxis=dict(visible=False),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            showlegend=False,
+        )
+        ret = ((end - start) / start) * 100
+        return fig, ret
+    except Exception:
+        return None, None
+
+
+
+# 카드 미니 차트 렌더링 방식: 'svg' (서버에서 만든 인라인 SVG, 기본) | 'plotly' (카드마다 Plotly 차트)
+MINI_CHART_MODE   = "svg"
+SPARKLINE_WIDTH   = 200   # viewBox 좌표 (실제 폭은 카드 폭에 맞춰 늘어남)
+SPARKLINE_HEIGHT  = 80    # px
+
+
+
+def get_sparkline_svg(df: pd.DataFrame, height: int = SPARKLINE_HEIGHT):
+    """
+    종가 시리즈 → 인라인 SVG 스파크라인 (get_mini_chart 와 같은 초록/빨강 규칙)
+    JS 차트 인스턴스 없이 수백 바이트 문자열로 렌더링됨
+    반환: (svg 문자열, 1개월 수익률%)  데이터가 없으면 (None, None)
+    """
+    try:
+        closes = df['Close'].dropna()
+        if len(closes) < 2:
+            return None, None
+        start, end = float(closes.iloc[0]), float(closes.iloc[-1])
+        line_color = '#26a65b' if end >= start else '#e74c3c'
+
+
+        lo, hi = float(closes.min()), float(closes.max())
+        span = (hi - lo) or 1.0
+        w, pad = SPARKLINE_WIDTH, 2
+        step = w / (len(closes) - 1)
+        points = ' '.join(
+            f"{i * step:.1f},{pad + (hi - v) / span * (height - 2 * pad):.1f}"
+            for i, v in enumerate(closes.tolist())
+        )
+        svg = (
+            f'<svg viewBox="0 0 {w} {height}" preserveAspectRatio="none" width="100%" height="{height}" '
+            f'xmlns="http://www.w3.org/2000/svg" style="display:block">'
+            f'<title>{end:,.2f}</title>'
+            f'<polygon points="0,{height} {points} {w},{height}" fill="{line_color}" fill-opacity="0.1"/>'
+            f'<polyline points="{points}" fill="none" stroke="{line_color}" stroke-width="1.5" '
+            f'vector-effect="non-scaling-stroke" stroke-linejoin="round"/>'
+            f'</svg>'
+        )
+        return svg, (end - start) / start * 100
+    except Exception:
+        return None, None
+
+
+
+# ── 주가 차트: 서버 측 다운샘플링 (기간이 길어도 전송량 상한 유지) ──
+CHART_PERIODS    = {"6개월": "6mo", "1년": "1y", "5년": "5y", "전체": "max"}
+CHART_STYLES     = ("캔들", "라인")
+CHART_MAX_BARS   = 260    # 캔들: 이보다 많으면 주봉 → 월봉 → 분기봉 → 연봉으로 재집계
+CHART_MAX_POINTS = 600    # 라인: 이보다 많으면 LTTB 로 축소
+CHART_WEBGL_MIN  = 1000   # 원본 점 수가 이 이상이면 라인을 WebGL(Scattergl)로 그림
+OHLC_RULES = [("W-FRI", "주봉"), ("MS", "월봉"), ("QS", "분기봉"), ("YS", "연봉")]
+
+
+
+def lttb_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: 모양(고점·저점)을 최대한 살려 threshold 개 점의 인덱스를 고름
+    x 는 거래일 순번(등간격)으로 봄. 첫 점과 마지막 점은 항상 포함
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float)
+    bucket = (n - 2) / (threshold - 2)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * bucket) + 1, int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+
+def resample_ohlc(df: pd.DataFrame, max_bars: int = CHART_MAX_BARS):
+    """일봉이 max_bars 를 넘으면 더 긴 봉으로 재집계. 반환: (df, 봉 이름)"""
+    if len(df) <= max_bars:
+        return df, "일봉"
+    for rule, label in OHLC_RULES:
+        bars = df.resample(rule).agg(
+            {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+        ).dropna(subset=['Close'])
+        if len(bars) <= max_bars:
+            break
+    return bars, label
+
+
+
+def build_price_figure(df: pd.DataFrame, style: str = "캔들"):
+    """반환: (fig, 표시 설명). 캔들은 봉 재집계, 라인은 LTTB — 어느 쪽이든 점 수에 상한이 있음"""
+    if style == "라인":
+        closes = df['Close'].to_numpy(dtype=float)
+        picked = lttb_indices(closes, CHART_MAX_POINTS)
+        trace = go.Scattergl if len(df) >= CHART_WEBGL_MIN else go.Scatter
+        fig = go.Figure(trace(
+            x=df.index[picked], y=closes[picked],
+            mode='lines', line=dict(color='#4c8ef7', width=1.5),
+            hovertemplate='%{x|%Y-%m-%d}<br>%{y:,.2f}<extra></extra>',
+        ))
+        note = f"종가 {len(df):,}일 → {len(picked):,}점" + (" (LTTB)" if len(picked) < len(df) else "")
+    else:
+        bars, label = resample_ohlc(df)
+        fig = go.Figure(go.Candlestick(
+            x=bars.index,
+            open=bars['Open'], high=bars['High'],
+            low=bars['Low'],   close=bars['Close'],
+        ))
+        note = f"{label} {len(bars):,}개" + (f" (일봉 {len(df):,}개 재집계)" if label != "일봉" else "")
+    fig.update_layout(xaxis_rangeslider_visible=False, height=340, margin=dict(l=0, r=0, t=10, b=0))
+    return fig, note
@@ -0,0 +1,145 @@
+"""동일 요청 합치기 (single-flight, 프로세스 전역)"""
+import threading
+
+from .cache import resource_cache
+
+
+
+class _Call:
+    def __init__(self):
+        self.event  = threading.Event()
+        self.result = None
+        self.error  = None
+
+
+
+class _Stream:
+    def __init__(self):
+        self.cond   = threading.Condition()
+        self.chunks = []
+        self.done   = False
+        self.error  = None
+
+
+
+class StreamAbandoned(Exception):
+    """같은 key 의 스트림을 읽던 첫 호출이 끝까지 읽지 않고 닫음"""
+
+
+
+class SingleFlight:
+    """
+    같은 key 로 동시에 들어온 호출은 먼저 온 하나만 실제로 실행하고
+    나머지는 그 결과(또는 예외)를 그대로 받아감 → 업스트림 호출 수 = 서로 다른 key 수
+    """
+
+    def __init__(self):
+        self._lock  = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.stats  = {'executed': 0, 'shared': 0}
+
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['executed'] += 1
+            else:
+                self.stats['shared'] += 1
+
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+
+    def do_stream(self, key, gen_fn, *args, **kwargs):
+        """
+        생성기 버전: 같은 key 로 동시에 들어온 스트림은 먼저 온 호출만 gen_fn 을 실제로 읽고,
+        나머지는 이미 나온 조각부터 순서대로 따라 읽음 (끝나면 같은 예외·종료를 받음)
+        """
+        with self._lock:
+            call = self._streams.get(key)
+            leader = call is None
+            if leader:
+                call = self._streams[key] = _Stream()
+                self.stats['executed'] += 1
+            else:
+                self.stats['shared'] += 1
+
+
+        if leader:
+            yield from self._lead(key, call, gen_fn(*args, **kwargs))
+        else:
+            yield from self._follow(call)
+
+
+    def _lead(self, key, call, gen):
+        try:
+            for chunk in gen:
+                with call.cond:
+                    call.chunks.append(chunk)
+                    call.cond.notify_all()
+                yield chunk
+        except Exception as e:
+            call.error = e
+            raise
+        except GeneratorExit:
+            call.error = StreamAbandoned(key)
+            raise
+        finally:
+            with self._lock:
+                del self._streams[key]
+            with call.cond:
+                call.done = True
+                call.cond.notify_all()
+
+
+    @staticmethod
+    def _follow(call):
+        seen = 0
+        while True:
+            with call.cond:
+                while seen >= len(call.chunks) and not call.done:
+                    call.cond.wait()
+                chunks, done = call.chunks[seen:], call.done
+            seen += len(chunks)
+            yield from chunks
+            if done:
+                if call.error is not None:
+                    raise call.error
+                return
+
+
+
+@resource_cache
+def get_single_flight() -> SingleFlight:
+    return SingleFlight()
+
+
+
+def coalesce(key, fn, *args, **kwargs):
+    return get_single_flight().do(key, fn, *args, **kwargs)
+
+
+
+def coalesce_stream(key, gen_fn, *args, **kwargs):
+    return get_single_flight().do_stream(key, gen_fn, *args, **kwargs)
@@ -0,0 +1,29 @@
+"""공용 설정: 데이터 파일 위치, Gemini API 키"""
+import os
+
+
+# 저장소에 포함된 읽기 전용 파일(stocks.db 초기 종목 목록)이 있는 폴더 = 저장소 루트
+BUNDLED_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 실행 중 쓰는 stock_data.db / prices.db / ai_cache.db / jobs.db 를 두는 폴더 (기본: 저장소 루트, 모두 git 미추적)
+DATA_DIR = os.environ.get("STOCK_AI_DATA_DIR", BUNDLED_DIR)
+
+
+_api_key = os.environ.get("GEMINI_API_KEY")
+
+
+
+def configure(api_key: str = None):
+    """Gemini API 키 등록 (실제 genai.configure 는 첫 Gemini 호출 때 실행)"""
+    global _api_key
+    if api_key:
+        _api_key = api_key
+
+
+
+def get_api_key() -> str:
+    return _api_key
+
+
+
+def data_path(filename: str) -> str:
+    return os.path.join(DATA_DIR, filename)
@@ -0,0 +1,132 @@
+"""
+주가·환율 DataFrame 공유 캐시 (프로세스 전역, 바이트 단위 상한)
+세션·rerun 마다 같은 프레임을 다시 만들지 않고, 사용자가 늘어도 메모리 사용량은 상한 안에서 유지
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from .cache import resource_cache
+from .concurrency import coalesce
+
+
+FRAME_CACHE_MAX_BYTES = int(os.environ.get("FRAME_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+_MISS = object()
+
+
+
+def sizeof(value) -> int:
+    """DataFrame 은 memory_usage(deep=True) 합계, 컨테이너는 내용물까지 합산한 대략적인 바이트 수"""
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+
+class ByteLRUCache:
+    """
+    항목 수가 아니라 바이트로 크기를 제한하는 LRU 캐시
+    - 항목마다 TTL, 상한을 넘으면 가장 오래 안 쓴 항목부터 제거
+    - 반환 값은 모든 세션이 공유하므로 호출하는 쪽에서 수정하지 말 것
+    - hits / misses / evictions / expired 통계 (프로세스 단위)
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes     = 0
+        self._items    = OrderedDict()   # key → (만료 시각, 크기, 값)
+        self._lock     = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+
+
+    def _drop(self, key):
+        _, size, _ = self._items.pop(key)
+        self.bytes -= size
+
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] <= time.monotonic():
+                self._drop(key)
+                self.expired += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+
+    def put(self, key, value, ttl: float) -> bool:
+        """저장 성공 여부 (값 하나가 상한보다 크면 저장하지 않음)"""
+        size = sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            if size > self.max_bytes:
+                return False
+            self._items[key] = (time.monotonic() + ttl, size, value)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._items)))
+                self.evictions += 1
+        return True
+
+
+    def get_or_load(self, key, ttl: float, loader, cacheable=None):
+        """
+        캐시에 없으면 loader() 로 만들어 저장. 같은 key 의 동시 적재는 한 번만 실행
+        cacheable(value) 가 False 면 (예: 빈 DataFrame) 저장하지 않고 그대로 반환
+        """
+        value = self.get(key, _MISS)
+        if value is not _MISS:
+            return value
+        value = coalesce(('frame_cache', key), loader)
+        if cacheable is None or cacheable(value):
+            self.put(key, value, ttl)
+        return value
+
+
+    def discard(self, match):
+        """match(key) 가 참인 항목 제거 (원본 데이터가 바뀌어 캐시된 프레임이 틀려졌을 때)"""
+        with self._lock:
+            for key in [k for k in self._items if match(k)]:
+                self._drop(key)
+
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries':   len(self._items),
+                'bytes':     self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits':      self.hits,
+                'misses':    self.misses,
+                'hit_rate':  self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'expired':   self.expired,
+            }
+
+
+
+@resource_cache
+def get_frame_cache() -> ByteLRUCache:
+    return ByteLRUCache(FRAME_CACHE_MAX_BYTES)
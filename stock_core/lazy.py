@@ -0,0 +1,22 @@
+"""무거운 외부 라이브러리를 처음 사용하는 순간에 import 하는 모듈 프록시"""
+import importlib
+import types
+
+
+
+class LazyModule(types.ModuleType):
+    """
+    속성에 처음 접근할 때 실제 모듈을 import 하고 그 내용을 자기 자신에 복사
+    이후 접근은 일반 모듈과 같은 속도 (처음 한 번만 __getattr__ 경유)
+    """
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """yf = lazy_import("yfinance") — import 비용은 yf.xxx 를 처음 쓸 때 발생"""
+    return LazyModule(name)
@@ -0,0 +1,600 @@
+"""AI 분석: LLM 제공자(Gemini / 가짜 모델), 분석 결과 디스크 캐시, 프롬프트, 분석 함수"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from .cache import resource_cache
+from .concurrency import coalesce, coalesce_stream
+from .config import data_path, get_api_key
+from .lazy import lazy_import
+from .upstream import get_upstream
+
+genai = lazy_import("google.generativeai")
+
+
+logger = logging.getLogger(__name__)
+
+
+
+GEMINI_MODEL = "models/gemini-2.5-flash"
+
+
+# ── LLM 제공자 (텍스트 생성 · 파일 업로드/대기 · 스트리밍) ──
+# LLM_PROVIDER=fake 로 실행하면 네트워크 없이 고정 응답을 돌려주는 가짜 모델 사용 (부하 테스트·벤치마크용)
+LLM_PROVIDER       = os.environ.get("LLM_PROVIDER", "gemini")
+FAKE_LLM_LATENCY   = float(os.environ.get("FAKE_LLM_LATENCY", "1.0"))   # 응답 1건 전체 지연 (초)
+FAKE_LLM_UPLOAD    = float(os.environ.get("FAKE_LLM_UPLOAD", "0.2"))    # 파일 업로드 지연 (초)
+FAKE_LLM_CHUNKS    = 8                                                  # 스트리밍 조각 수
+GEMINI_FILE_TIMEOUT   = 60    # 업로드 파일 PROCESSING 대기 한도 (초)
+GEMINI_POLL_INITIAL   = 0.5   # 첫 상태 확인 간격 (초), 이후 2배씩 증가
+GEMINI_POLL_MAX       = 8.0
+
+
+
+class GeminiProvider:
+    """google.generativeai 구현. 모든 호출은 'gemini' 업스트림 관문(속도 제한·재시도·서킷)을 거침"""
+
+    def __init__(self, model_name: str = GEMINI_MODEL):
+        self.model_name = model_name
+        genai.configure(api_key=get_api_key())
+        self._model     = genai.GenerativeModel(model_name)
+        self._upstream  = get_upstream('gemini')
+
+
+    def generate(self, contents, generation_config: dict = None, key=None) -> str:
+        """contents: 프롬프트 문자열 또는 [업로드 파일, 프롬프트]. key 는 장애 시 대체 응답 조회용"""
+        return self._upstream.call(
+            key, lambda: self._model.generate_content(contents, generation_config=generation_config).text
+        )
+
+
+    def stream(self, prompt: str):
+        # 스트림은 중간에 다시 시작할 수 없으므로 재시도 없이 속도 제한·서킷만 적용
+        self._upstream.admit()
+        ok = None
+        try:
+            for chunk in self._model.generate_content(prompt, stream=True):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue  # 텍스트 없는 조각 (안전 필터 메타데이터 등)
+                yield text
+            ok = True
+        except Exception:
+            ok = False
+            raise
+        finally:
+            if ok is None:
+                self._upstream.release()  # 소비자가 중간에 닫음: 판정 없이 시험 호출 자리만 반납
+            else:
+                self._upstream.report(ok)
+
+
+    def upload(self, path: str):
+        return self._upstream.call(None, genai.upload_file, path)
+
+
+    def wait_active(self, handle, on_progress=None):
+        """PROCESSING 상태가 끝날 때까지 지수 백오프로 상태 확인. 시간 초과 시 None"""
+        delay = GEMINI_POLL_INITIAL
+        deadline = time.time() + GEMINI_FILE_TIMEOUT
+        while handle.state.name == "PROCESSING":
+            if time.time() >= deadline:
+                return None
+            time.sleep(min(delay, max(deadline - time.time(), 0)))
+            delay = min(delay * 2, GEMINI_POLL_MAX)
+            handle = genai.get_file(handle.name)
+            if on_progress:
+                on_progress("2️⃣ AI가 오디오를 처리 중...")
+        return handle
+
+
+    def file_state(self, handle) -> str:
+        return handle.state.name
+
+
+    def delete(self, handle):
+        genai.delete_file(handle.name)
+
+
+
+class _FakeFile:
+    def __init__(self, name: str, digest: str):
+        self.name   = name
+        self.digest = digest
+
+
+
+# 가짜 모델의 추천 응답에 쓰이는 종목 (StockPick.from_ai 검증을 통과하는 형식)
+FAKE_RECOMMEND_POOL = [
+    ("US", "Apple", "AAPL"), ("US", "Microsoft", "MSFT"), ("US", "NVIDIA", "NVDA"),
+    ("KR", "삼성전자", "005930.KS"), ("KR", "NAVER", "035420.KS"), ("KR", "에코프로비엠", "247540.KQ"),
+]
+
+
+
+class FakeLLMProvider:
+    """
+    네트워크 없이 고정 응답을 돌려주는 가짜 모델
+    같은 입력 → 같은 출력 (입력 해시 기반), 지연 시간은 설정값 그대로 sleep
+    stats 의 max_in_flight 로 파이프라인이 실제로 몇 건을 동시에 보내는지 확인 가능
+    """
+
+    def __init__(self, latency: float = FAKE_LLM_LATENCY, upload_latency: float = FAKE_LLM_UPLOAD,
+                 chunks: int = FAKE_LLM_CHUNKS, model_name: str = "fake-llm"):
+        self.model_name     = model_name
+        self.latency        = latency
+        self.upload_latency = upload_latency
+        self.chunks         = chunks
+        self._lock          = threading.Lock()
+        self._in_flight     = 0
+        self.stats          = {'generate': 0, 'stream': 0, 'upload': 0, 'max_in_flight': 0}
+
+
+    def _enter(self, kind: str):
+        with self._lock:
+            self.stats[kind] += 1
+            self._in_flight += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self._in_flight)
+
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+
+    @staticmethod
+    def _digest(contents) -> str:
+        parts = contents if isinstance(contents, list) else [contents]
+        h = hashlib.sha256()
+        for p in parts:
+            h.update((p.digest if isinstance(p, _FakeFile) else str(p)).encode('utf-8'))
+        return h.hexdigest()
+
+
+    def _respond(self, contents, generation_config: dict = None) -> str:
+        digest = self._digest(contents)
+        rng = random.Random(digest)
+        length = sum(len(str(p)) for p in (contents if isinstance(contents, list) else [contents]))
+        if generation_config and "response_schema" in generation_config:
+            def picks(difficulty):
+                return [
+                    {"market": m, "name": n, "ticker": t,
+                     "summary": f"{n} 요약 ({digest[:6]})", "reason": f"{n} 추천 이유",
+                     "risk": f"{n} 리스크", "difficulty": difficulty}
+                    for m, n, t in rng.sample(FAKE_RECOMMEND_POOL, 3)
+                ]
+            return json.dumps({"beginner": picks(2), "expert": picks(4)}, ensure_ascii=False)
+        return (
+            f"## 1. 📺 핵심 요약 (fake {digest[:12]})\n"
+            f"- 테스트용 고정 응답입니다. 입력 길이 {length}자\n"
+            f"## 2. 📈 매매 의견: {rng.choice(['매수', '매도', '관망'])}\n"
+            f"## 3. 💡 주요 근거\n- 근거 {rng.randint(1, 99)}"
+        )
+
+
+    def generate(self, contents, generation_config: dict = None, key=None) -> str:
+        self._enter('generate')
+        try:
+            time.sleep(self.latency)
+            return self._respond(contents, generation_config)
+        finally:
+            self._exit()
+
+
+    def stream(self, prompt: str):
+        self._enter('stream')
+        try:
+            text = self._respond(prompt)
+            step = -(-len(text) // self.chunks)
+            for i in range(0, len(text), step):
+                time.sleep(self.latency / self.chunks)
+                yield text[i:i + step]
+        finally:
+            self._exit()
+
+
+    def upload(self, path: str):
+        self._enter('upload')
+        try:
+            time.sleep(self.upload_latency)
+            return _FakeFile(f"files/fake-{uuid.uuid4().hex[:8]}", file_sha256(path))
+        finally:
+            self._exit()
+
+
+    def wait_active(self, handle, on_progress=None):
+        return handle
+
+
+    def file_state(self, handle) -> str:
+        return "ACTIVE"
+
+
+    def delete(self, handle):
+        pass
+
+
+
+@resource_cache
+def get_llm_provider(name: str = None):
+    """LLM_PROVIDER 설정('gemini' | 'fake')에 맞는 제공자 (프로세스당 1개)"""
+    name = name or LLM_PROVIDER
+    if name == "fake":
+        return FakeLLMProvider()
+    if name == "gemini":
+        return GeminiProvider()
+    raise ValueError(f"알 수 없는 LLM 제공자: {name}")
+
+
+# ── 분석 결과 디스크 캐시 (모델명 + 프롬프트 해시 + 미디어 해시 → 응답) ──
+AI_CACHE_DB_PATH   = data_path("ai_cache.db")
+AI_CACHE_MAX_BYTES = 50 * 1024 * 1024
+AI_CACHE_TTL = {            # 콘텐츠 종류별 유효 시간 (초)
+    'text':      6 * 3600,       # 뉴스는 빨리 낡음
+    'recommend': 24 * 3600,      # 오늘의 시장 기준 추천
+    'audio':     30 * 24 * 3600, # 같은 영상 → 같은 요약
+    'transcript': 30 * 24 * 3600,
+    'video_notes': 30 * 24 * 3600,
+}
+
+
+
+def ai_cache_key(model_name: str, prompt: str, media_hash: str = '') -> str:
+    return hashlib.sha256('\0'.join((model_name, prompt, media_hash)).encode('utf-8')).hexdigest()
+
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+
+class AnalysisCache:
+    """
+    SQLite 기반 분석 결과 캐시
+    - 콘텐츠 종류별 TTL, 전체 크기 상한 초과 시 가장 오래 안 쓴 항목부터 삭제 (LRU)
+    - hits / misses / evictions 통계 (프로세스 단위)
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: dict):
+        self.path      = path
+        self.max_bytes = max_bytes
+        self.ttl       = ttl
+        self._lock     = threading.Lock()
+        self._stats    = {'hits': 0, 'misses': 0, 'evictions': 0}
+        conn = self._conn()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                "key TEXT PRIMARY KEY, content_type TEXT, value TEXT, size INTEGER, "
+                "created_at REAL, accessed_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ai_cache_accessed ON ai_cache (accessed_at)")
+        finally:
+            conn.close()
+
+
+    def _conn(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+
+    def get(self, key: str, content_type: str):
+        now = time.time()
+        conn = self._conn()
+        try:
+            row = conn.execute("SELECT value, created_at FROM ai_cache WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl.get(content_type, 0):
+                conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count('misses')
+                return None
+            conn.execute("UPDATE ai_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._count('hits')
+            return row[0]
+        finally:
+            conn.close()
+
+
+    def put(self, key: str, content_type: str, value: str):
+        now  = time.time()
+        size = len(value.encode('utf-8'))
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT OR REPLACE INTO ai_cache VALUES (?, ?, ?, ?, ?, ?)",
+                         (key, content_type, value, size, now, now))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ai_cache").fetchone()[0]
+            evicted = 0
+            for old_key, old_size in conn.execute(
+                "SELECT key, size FROM ai_cache WHERE key != ? ORDER BY accessed_at", (key,)
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM ai_cache WHERE key = ?", (old_key,))
+                total -= old_size
+                evicted += 1
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        if evicted:
+            self._count('evictions', evicted)
+
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        try:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ai_cache").fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats.update(entries=entries, bytes=size,
+                     hit_rate=(stats['hits'] / lookups) if lookups else 0.0)
+        return stats
+
+
+
+@resource_cache
+def get_analysis_cache() -> AnalysisCache:
+    return AnalysisCache(AI_CACHE_DB_PATH, AI_CACHE_MAX_BYTES, AI_CACHE_TTL)
+
+
+
+def generate_text(llm, prompt: str, content_type: str = 'text', generation_config: dict = None,
+                  refresh: bool = False, validate=None) -> str:
+    """
+    캐시 확인 → (미스) 동일 모델·프롬프트의 동시 생성 요청은 하나로 합쳐 생성 → 저장
+    refresh=True 면 캐시를 건너뛰고 새로 생성 (결과는 캐시에 덮어씀)
+    validate(text) 가 예외를 내는 응답은 캐시에 저장하지 않음 (캐시에 있던 것이면 새로 생성)
+    """
+    cache = get_analysis_cache()
+    config_hash = json.dumps(generation_config, sort_keys=True, ensure_ascii=False) if generation_config else ''
+    key = ai_cache_key(llm.model_name, prompt, config_hash)
+    cached = None if refresh else cache.get(key, content_type)
+    if cached is not None:
+        try:
+            if validate is not None:
+                validate(cached)
+            return cached
+        except Exception:
+            logger.warning("캐시된 %s 응답 검증 실패 → 새로 생성", content_type)
+
+
+    def run():
+        text = llm.generate(prompt, generation_config, key=key)
+        if validate is not None:
+            validate(text)
+        cache.put(key, content_type, text)
+        return text
+
+
+    return coalesce(('gemini', key), run)
+
+
+
+# 영상 분석 리포트 양식 (오디오·자막 공용)
+VIDEO_REPORT_FORMAT = """양식:
+            ## 1. 📺 영상 핵심 3줄 요약
+            ## 2. 📈 매매 의견 (매수/매도/관망) 및 목표가
+            ## 3. 💡 주요 근거 및 포인트"""
+
+
+
+# 추천 종목 응답 스키마 (Gemini response_schema, OpenAPI 부분집합)
+RECOMMEND_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "market":     {"type": "string", "description": "KR 또는 US"},
+        "name":       {"type": "string"},
+        "ticker":     {"type": "string", "description": "예: 005930.KS, 247540.KQ, AAPL"},
+        "summary":    {"type": "string"},
+        "reason":     {"type": "string"},
+        "risk":       {"type": "string"},
+        "difficulty": {"type": "integer", "description": "1(쉬움) ~ 5(어려움)"},
+    },
+    "required": ["market", "name", "ticker", "summary", "reason", "risk", "difficulty"],
+}
+RECOMMEND_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "beginner": {"type": "array", "items": RECOMMEND_ITEM_SCHEMA},
+        "expert":   {"type": "array", "items": RECOMMEND_ITEM_SCHEMA},
+    },
+    "required": ["beginner", "expert"],
+}
+RECOMMEND_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": RECOMMEND_SCHEMA,
+}
+
+
+
+def build_text_prompt(content_type: str, content_data, market_type: str = 'KR') -> str:
+    """뉴스('text') / 추천('recommend') / 영상 자막('transcript') / 구간 노트('video_notes') 프롬프트 생성"""
+    # ── 긴 영상 구간별 노트 종합 ──────────────────────
+    if content_type == "video_notes":
+        return f"""
+        다음은 긴 주식 관련 유튜브 영상을 구간별로 정리한 노트입니다.
+        전체 영상의 핵심 내용을 투자자 입장에서 한국어로 종합해줘.
+        [구간별 노트]\n{content_data}
+        {VIDEO_REPORT_FORMAT}
+        """
+
+
+    # ── 유튜브 자막 분석 ─────────────────────────────
+    if content_type == "transcript":
+        return f"""
+        다음은 주식 관련 유튜브 영상의 자막입니다.
+        영상의 핵심 내용을 투자자 입장에서 한국어로 요약해줘.
+        [자막]\n{content_data}
+        {VIDEO_REPORT_FORMAT}
+        """
+
+
+    # ── 뉴스 텍스트 분석 ─────────────────────────────
+    if content_type == "text":
+        if market_type == 'US':
+            prompt = f"""
+            다음은 미국 주식 관련 영문 뉴스 기사들입니다.
+            이를 한국어로 번역·종합하여 투자 리포트를 작성해줘.
+            [뉴스 데이터]\n{content_data}
+            양식:
+            ## 1. 📰 최신 뉴스 종합 3줄 요약 (한국어)
+            ## 2. 📈 시장의 종합적 의견 (매수/매도/관망)
+            ## 3. ⚠️ 주요 리스크 및 호재 요인
+            """
+        else:
+            prompt = f"""
+            다음 뉴스 기사들을 종합하여 투자 리포트를 작성해줘.
+            [뉴스 데이터]\n{content_data}
+            양식:
+            ## 1. 📰 최신 뉴스 종합 3줄 요약
+            ## 2. 📈 시장의 종합적 의견 (매수/매도/관망)
+            ## 3. ⚠️ 주요 리스크 및 호재 요인
+            """
+        return prompt
+
+
+    # ── 추천 종목 생성 (초보자·고수 한 번에, JSON 스키마 출력) ──
+    # content_data: 기준 거래일 'YYYY-MM-DD' — 프롬프트(=캐시 키)가 거래일마다 달라져 전날 응답을 재사용하지 않음
+    elif content_type == "recommend":
+        return f"""
+        {content_data} 거래일 기준, 오늘의 시장 상황을 반영해 두 그룹의 주식을 추천해줘. 각 그룹마다 국내(KR) 3종목, 미국(US) 3종목.
+
+
+        beginner: 주식 투자 초보자용. 기준: 변동성 낮음, 배당 안정적, 글로벌 브랜드 인지도 높음, 장기 보유 적합. 난이도 1~2.
+        expert: 주식 고수(경험 많은 투자자)용. 기준: 성장 모멘텀 강함, 기관/외국인 매수세, AI·반도체·바이오 테마 유망. 난이도 3~5.
+
+
+        ticker 는 야후 파이낸스 표기: 국내는 6자리 코드 + .KS(코스피) / .KQ(코스닥), 미국은 티커 그대로.
+        summary·reason·risk 는 각각 한국어 한 문장.
+        """
+    raise ValueError(f"알 수 없는 분석 유형: {content_type}")
+
+
+
+def analyze_audio_file(llm, path: str, prompt: str, on_progress=None) -> str:
+    """오디오 업로드 → 처리 대기 → 생성. 같은 파일·프롬프트면 업로드 전에 캐시에서 반환"""
+    cache = get_analysis_cache()
+    key = ai_cache_key(llm.model_name, prompt, file_sha256(path))
+    cached = cache.get(key, 'audio')
+    if cached is not None:
+        return cached
+
+
+    if on_progress:
+        on_progress("2️⃣ 오디오 업로드 중...")
+    uploaded_file = llm.wait_active(llm.upload(path), on_progress)
+    if uploaded_file is None:
+        return f"❌ 파일 처리 시간 초과 ({GEMINI_FILE_TIMEOUT}초 경과)"
+    if llm.file_state(uploaded_file) == "FAILED":
+        return "❌ 구글 AI 처리 실패"
+    if on_progress:
+        on_progress("3️⃣ AI가 내용을 분석 중...")
+    try:
+        text = llm.generate([uploaded_file, prompt], key=key)
+    finally:
+        llm.delete(uploaded_file)
+    cache.put(key, 'audio', text)
+    return text
+
+
+
+def analyze_with_gemini(content_type: str, content_data, market_type: str = 'KR', on_progress=None, llm=None):
+    """llm 을 넘기면 그 제공자로 실행 (기본: LLM_PROVIDER 설정의 공용 제공자)"""
+    try:
+        llm = llm or get_llm_provider()
+
+
+        # ── 오디오 (유튜브) ──────────────────────────────
+        if content_type == "audio":
+            prompt = f"""
+            이 주식 관련 영상의 핵심 내용을 투자자 입장에서 한국어로 요약해줘.
+            {VIDEO_REPORT_FORMAT}
+            """
+            return analyze_audio_file(llm, content_data, prompt, on_progress)
+
+
+        # ── 긴 영상의 한 구간 (content_data = (경로, 구간 번호, 전체 구간 수)) ──
+        elif content_type == "audio_segment":
+            path, index, total = content_data
+            prompt = f"""
+            이 오디오는 주식 관련 영상을 {total}개로 나눈 것 중 {index}번째 구간이야.
+            이 구간에서 언급된 종목·가격·매매 의견·근거를 한국어 bullet 로 빠짐없이 정리해줘.
+            """
+            return analyze_audio_file(llm, path, prompt)
+
+
+        # ── 추천 종목 생성 (JSON) ─────────────────────────
+        elif content_type == "recommend":
+            prompt = build_text_prompt(content_type, content_data, market_type)
+            return generate_text(llm, prompt, content_type, RECOMMEND_GENERATION_CONFIG)
+
+
+        # ── 뉴스 텍스트 분석 / 영상 자막 분석 ──────────────
+        elif content_type in ("text", "transcript", "video_notes"):
+            prompt = build_text_prompt(content_type, content_data, market_type)
+            return generate_text(llm, prompt, content_type)
+
+
+    except Exception as e:
+        return f"❌ AI 분석 중 에러 발생: {e}"
+
+
+
+def generate_text_stream(llm, prompt: str, content_type: str = 'text'):
+    """
+    생성되는 대로 텍스트 조각을 yield
+    캐시 적중 시 전체를 한 번에 내보내고, 끝까지 받은 응답만 캐시에 저장
+    같은 모델·프롬프트의 동시 요청은 스트림 하나를 공유 (나중 호출은 이미 나온 조각부터 따라 읽음)
+    """
+    cache = get_analysis_cache()
+    key = ai_cache_key(llm.model_name, prompt)
+    cached = cache.get(key, content_type)
+    if cached is not None:
+        yield cached
+        return
+
+
+    def produce():
+        parts = []
+        for text in llm.stream(prompt):
+            parts.append(text)
+            yield text
+        cache.put(key, content_type, ''.join(parts))
+
+
+    yield from coalesce_stream(('gemini_stream', key), produce)
+
+
+
+def analyze_with_gemini_stream(content_type: str, content_data, market_type: str = 'KR'):
+    """analyze_with_gemini 의 스트리밍 버전 (텍스트 프롬프트 전용)"""
+    try:
+        llm = get_llm_provider()
+        prompt = build_text_prompt(content_type, content_data, market_type)
+        yield from generate_text_stream(llm, prompt, content_type)
+    except Exception as e:
+        yield f"❌ AI 분석 중 에러 발생: {e}"
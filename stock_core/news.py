@@ -0,0 +1,250 @@
+"""뉴스 분석: 검색어 변형 병렬 조회 → 중복 제거·토큰 예산 안에서 프롬프트 조립 → AI 리포트"""
+from __future__ import annotations
+
+import logging
+import queue
+import re
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import ttl_cache
+from .lazy import lazy_import
+from .llm import analyze_with_gemini, analyze_with_gemini_stream
+from .upstream import upstream_call
+
+ddgs = lazy_import("duckduckgo_search")
+pd = lazy_import("pandas")
+
+
+logger = logging.getLogger(__name__)
+
+
+
+NEWS_CACHE_TTL         = 1800   # 검색어별 결과 캐시 유지 시간 (초)
+NEWS_RESULTS_PER_QUERY = 5
+TRACKING_PARAMS        = re.compile(r'^(utm_|fbclid|gclid|ref$|from$)')
+
+
+
+def news_queries(keyword: str, market_type: str = 'KR', ticker: str = None) -> list:
+    """
+    검색어 변형 목록 [(종류, 검색어), ...]  종류: 'text' (웹 검색) / 'news' (뉴스 검색)
+    한국어 '주가 전망', 영어 'stock forecast', 티커 등 회사 별칭을 함께 사용
+    """
+    if market_type == 'US':
+        queries = [
+            ('text', f"{keyword} stock forecast analysis"),
+            ('news', f"{keyword} stock forecast"),
+            ('news', f"{keyword} 주가 전망"),
+        ]
+        if ticker and ticker.lower() != keyword.lower():
+            queries.append(('news', f"{ticker} stock"))
+    else:
+        queries = [
+            ('text', f"{keyword} 주가 전망"),
+            ('news', f"{keyword} 주가 전망"),
+            ('news', f"{keyword} 실적"),
+        ]
+        if ticker:
+            queries.append(('news', f"{keyword} {ticker.split('.')[0]} stock forecast"))
+    return queries
+
+
+
+def normalize_url(url: str) -> str:
+    """중복 판정용 URL (스킴·www·추적 파라미터·끝 슬래시 제거)"""
+    parts = urllib.parse.urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix('www.')
+    query = urllib.parse.urlencode(
+        [(k, v) for k, v in urllib.parse.parse_qsl(parts.query) if not TRACKING_PARAMS.match(k)]
+    )
+    return f"{host}{parts.path.rstrip('/')}" + (f"?{query}" if query else '')
+
+
+
+@ttl_cache(NEWS_CACHE_TTL)
+def fetch_news_query(kind: str, q: str, max_results: int = NEWS_RESULTS_PER_QUERY) -> list:
+    """
+    검색어 하나의 결과를 정규화해서 반환 (TTL 동안 모든 세션이 공유)
+    기사: {'title', 'body', 'href', 'source', 'date', 'query'}
+    """
+    if kind == 'news':
+        raw = upstream_call('ddgs', ('news', q, max_results), lambda: ddgs.DDGS().news(q, max_results=max_results))
+    else:
+        raw = upstream_call('ddgs', ('text', q, max_results), lambda: ddgs.DDGS().text(q, max_results=max_results))
+    articles = []
+    for r in raw or []:
+        href = r.get('href') or r.get('url')
+        if not href:
+            continue
+        articles.append({
+            'title':  r.get('title', ''),
+            'body':   r.get('body', ''),
+            'href':   href,
+            'source': r.get('source', ''),
+            'date':   r.get('date', ''),
+            'query':  q,
+        })
+    return articles
+
+
+
+def search_news(keyword: str, market_type: str = 'KR', ticker: str = None) -> list:
+    """
+    검색어 변형을 병렬로 조회해 URL 기준으로 합침
+    반환: 기사 리스트 (기사마다 'hits' = 이 기사를 돌려준 검색어 수)
+    """
+    queries = news_queries(keyword, market_type, ticker)
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        futures = [pool.submit(fetch_news_query, kind, q) for kind, q in queries]
+    results, seen, errors = [], {}, []
+    for fut in futures:
+        try:
+            articles = fut.result()
+        except Exception as e:
+            errors.append(e)
+            continue
+        for a in articles:
+            key = normalize_url(a['href'])
+            if key in seen:
+                seen[key]['hits'] += 1  # 여러 검색어에 걸린 기사 = 관련도 높음
+                continue
+            seen[key] = dict(a, hits=1)
+            results.append(seen[key])
+    if not results and errors and len(errors) == len(queries):
+        raise errors[0]
+    return results
+
+
+
+# ── 프롬프트 조립: 중복 기사 제거 + 토큰 예산 ─────────────
+NEWS_TOKEN_BUDGET   = 1500   # 기사 부분 전체 토큰 예산 (추정치)
+NEWS_MIN_ARTICLE    = 80     # 기사 1개에 최소한 남길 토큰
+NEWS_DUP_THRESHOLD  = 0.5    # 슁글 자카드 유사도가 이 이상이면 같은 기사(전재·복사본)로 봄
+SHINGLE_SIZE        = 5      # 글자 단위 슁글 길이 (공백 제거 후, 한글·영문 공용)
+
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수: 한글 1글자 ≈ 1토큰, 그 외 4글자 ≈ 1토큰"""
+    hangul = len(re.findall(r'[가-힣]', text))
+    return hangul + (len(text) - hangul + 3) // 4
+
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0
+    for i, ch in enumerate(text):
+        used += 1 if '가' <= ch <= '힣' else 0.25
+        if used > max_tokens:
+            return text[:i].rstrip() + "…"
+    return text
+
+
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> set:
+    t = re.sub(r'\s+', '', text.lower())
+    return {t[i:i + k] for i in range(max(len(t) - k + 1, 1))}
+
+
+
+def _article_date(a: dict):
+    ts = pd.to_datetime(a.get('date') or None, utc=True, errors='coerce')
+    return None if pd.isna(ts) else ts
+
+
+
+def build_news_prompt(articles: list, keyword: str, budget: int = NEWS_TOKEN_BUDGET):
+    """
+    1) 관련도(여러 검색어 적중 수·제목/본문의 종목명) → 최신순으로 정렬
+    2) 슁글 유사도로 신디케이션 복사본 제거
+    3) 토큰 예산을 기사 수로 나눠 본문을 잘라냄
+    반환: (프롬프트용 뉴스 텍스트, 사용한 기사, 통계 dict)
+    """
+    kw = keyword.lower()
+
+
+    def rank(a):
+        relevance = a.get('hits', 1) + 2 * (kw in a['title'].lower()) + (kw in a['body'].lower())
+        date = _article_date(a)
+        return (-relevance, -(date.timestamp() if date is not None else 0))
+
+
+    unique, kept_shingles, duplicates = [], [], 0
+    for a in sorted(articles, key=rank):
+        sh = shingles(a['title'] + ' ' + a['body'])
+        if any(len(sh & other) / len(sh | other) >= NEWS_DUP_THRESHOLD for other in kept_shingles):
+            duplicates += 1
+            continue
+        kept_shingles.append(sh)
+        unique.append(a)
+
+
+    def frame(i, a, body):
+        date = _article_date(a)
+        head = f"[{i}] {a['title']}" + (f" ({date:%Y-%m-%d})" if date is not None else "")
+        return f"{head}\n{body}\nLink: {a['href']}\n\n"
+
+
+    # 제목·링크 몫을 먼저 떼고 남은 예산을 본문에 균등 배분
+    overhead = sum(estimate_tokens(frame(i, a, '')) for i, a in enumerate(unique, start=1))
+    per_article = max((budget - overhead) // max(len(unique), 1), NEWS_MIN_ARTICLE)
+    parts, used, total = [], [], 0
+    for a in unique:
+        entry = frame(len(used) + 1, a, trim_to_tokens(a['body'], per_article))
+        cost = estimate_tokens(entry)
+        if used and total + cost > budget:
+            break
+        parts.append(entry)
+        used.append(a)
+        total += cost
+
+
+    news_text = "".join(parts)
+    raw_tokens = sum(estimate_tokens(f"{a['title']}\n{a['body']}\nLink: {a['href']}\n\n") for a in articles)
+    stats = {
+        'articles_in':   len(articles),
+        'duplicates':    duplicates,
+        'articles_used': len(used),
+        'raw_tokens':    raw_tokens,
+        'prompt_tokens': estimate_tokens(news_text),
+        'prompt_chars':  len(news_text),
+    }
+    logger.info("뉴스 프롬프트 [%s]: %s", keyword, stats)
+    return news_text, used, stats
+
+
+
+def get_news_analysis(keyword: str, market_type: str = 'KR', ticker: str = None):
+    try:
+        articles = search_news(keyword, market_type, ticker)
+        if not articles:
+            return "❌ 검색된 뉴스가 없습니다.", None
+        news_text, used, _ = build_news_prompt(articles, keyword)
+        return analyze_with_gemini("text", news_text, market_type), used
+    except Exception as e:
+        return f"❌ 뉴스 검색 오류: {e}", None
+
+
+
+def stream_news_analysis(keyword: str, market_type: str, out: queue.Queue, ticker: str = None):
+    """
+    뉴스 검색 후 리포트를 스트리밍 생성 (워커 스레드용)
+    out 으로 ('chunk', 누적 텍스트) … ('done', 최종 텍스트, 사용한 기사, 프롬프트 통계) 순서로 전달
+    """
+    try:
+        articles = search_news(keyword, market_type, ticker)
+    except Exception as e:
+        out.put(('done', f"❌ 뉴스 검색 오류: {e}", None, None))
+        return
+    if not articles:
+        out.put(('done', "❌ 검색된 뉴스가 없습니다.", None, None))
+        return
+    news_text, used, stats = build_news_prompt(articles, keyword)
+    text = ''
+    for chunk in analyze_with_gemini_stream("text", news_text, market_type):
+        text += chunk
+        out.put(('chunk', text))
+    out.put(('done', text, used, stats))
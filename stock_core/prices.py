@@ -0,0 +1,262 @@
+"""
+주가·환율 데이터 조회
+일봉을 로컬 SQLite(prices.db)에 쌓아두고, 마지막 저장 봉 이후의 꼬리만 하루 1회 받아옴
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+
+from .config import data_path
+from .frame_cache import get_frame_cache
+from .lazy import lazy_import
+from .upstream import upstream_call
+
+pd = lazy_import("pandas")
+yf = lazy_import("yfinance")
+
+
+
+PRICE_DB_PATH = data_path("prices.db")
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# 공유 프레임 캐시 TTL (초) — 반환된 DataFrame 은 세션 간 공유되므로 수정하지 말 것
+PRICE_CACHE_TTL      = 600
+MINI_CHART_CACHE_TTL = 1800
+
+
+
+def yf_history(ticker: str, **kwargs) -> pd.DataFrame:
+    """
+    yf.Ticker(t).history(...) — 동시에 들어온 같은 요청은 한 번만 다운로드
+    빈 응답(스로틀링)은 재시도하고, 장애 중에는 마지막 정상 응답으로 대체
+    """
+    key = ('history', ticker, tuple(sorted(kwargs.items())))
+    return upstream_call('yfinance', key, lambda: yf.Ticker(ticker).history(**kwargs),
+                         accept=lambda df: not df.empty)
+
+
+
+def _period_start(period: str):
+    """yfinance period 문자열('1mo','6mo','1y','5y','max' 등) → 조회 시작일 (max 는 None)"""
+    today = pd.Timestamp.today().normalize()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return today.replace(month=1, day=1)
+    m = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not m:
+        raise ValueError(f"지원하지 않는 기간: {period}")
+    n, unit = int(m.group(1)), m.group(2)
+    offset = {
+        'd':  pd.DateOffset(days=n),
+        'wk': pd.DateOffset(weeks=n),
+        'mo': pd.DateOffset(months=n),
+        'y':  pd.DateOffset(years=n),
+    }[unit]
+    return today - offset
+
+
+
+def _price_conn():
+    conn = sqlite3.connect(PRICE_DB_PATH, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS price_bars ("
+        "ticker TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume REAL, "
+        "PRIMARY KEY (ticker, date))"
+    )
+    # start_date: 저장소가 보장하는 구간 시작일 ('' = 전체 상장 기간), fetched_on: 마지막 갱신일
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS price_meta ("
+        "ticker TEXT PRIMARY KEY, start_date TEXT, fetched_on TEXT)"
+    )
+    return conn
+
+
+
+def _save_bars(conn, ticker: str, df: pd.DataFrame):
+    df = df.dropna(subset=['Close'])
+    rows = [
+        (ticker, ts.strftime('%Y-%m-%d'),
+         float(r['Open']), float(r['High']), float(r['Low']), float(r['Close']), float(r['Volume']))
+        for ts, r in df[PRICE_COLUMNS].iterrows()
+    ]
+    conn.executemany("INSERT OR REPLACE INTO price_bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+
+def _has_corporate_action(df: pd.DataFrame, after: str) -> bool:
+    """
+    after('YYYY-MM-DD') 이후 봉에 주식 분할 또는 배당이 있었는지 (history() 의 'Stock Splits'/'Dividends' 컬럼)
+    델타는 이미 저장된 마지막 봉부터 받으므로, 그 봉의 이벤트는 이미 반영된 것으로 보고 제외
+    """
+    if df.empty:
+        return False
+    new = df[df.index.strftime('%Y-%m-%d') > after]
+    for col in ('Stock Splits', 'Dividends'):
+        if col in new.columns and (new[col].fillna(0) != 0).any():
+            return True
+    return False
+
+
+
+def _load_bars(conn, ticker: str, start) -> pd.DataFrame:
+    df = pd.read_sql_query(
+        "SELECT date, open, high, low, close, volume FROM price_bars "
+        "WHERE ticker = ? AND date >= ? ORDER BY date",
+        conn,
+        params=(ticker, '' if start is None else start.strftime('%Y-%m-%d')),
+        parse_dates=['date'],
+    )
+    df = df.set_index('date')
+    df.index.name = 'Date'
+    df.columns = PRICE_COLUMNS
+    return df
+
+
+
+def _has_rows(df) -> bool:
+    return df is not None and not df.empty
+
+
+
+def get_stock_data(ticker: str, period: str = "6mo"):
+    """(ticker, period) 별 결과를 공유 프레임 캐시에 보관 — rerun 마다 SQLite 를 다시 읽지 않음"""
+    return get_frame_cache().get_or_load(
+        ('stock', ticker, period), PRICE_CACHE_TTL,
+        lambda: _load_stock_data(ticker, period), cacheable=_has_rows,
+    )
+
+
+
+def _load_stock_data(ticker: str, period: str):
+    """
+    저장소에 요청 구간이 있으면 로컬에서 바로 반환하고,
+    오늘 아직 갱신하지 않았다면 마지막 저장 봉부터의 델타만 yfinance에서 받아옴.
+    저장된 구간보다 긴 기간을 요청하면 해당 기간 전체를 한 번 다시 받음.
+    """
+    start = _period_start(period)
+    start_str = '' if start is None else start.strftime('%Y-%m-%d')
+    today = pd.Timestamp.today().strftime('%Y-%m-%d')
+
+    conn = _price_conn()
+    try:
+        meta = conn.execute(
+            "SELECT start_date, fetched_on FROM price_meta WHERE ticker = ?", (ticker,)
+        ).fetchone()
+        covered = meta is not None and meta[0] <= start_str
+
+        if not covered:
+            # 최초 조회이거나 저장 구간보다 긴 기간 요청 → 요청 기간 전체 다운로드
+            df_new = yf_history(ticker, period=period)
+            if df_new.empty:
+                return df_new
+            _save_bars(conn, ticker, df_new)
+            conn.execute("INSERT OR REPLACE INTO price_meta VALUES (?, ?, ?)",
+                         (ticker, start_str, today))
+            conn.commit()
+        elif meta[1] < today:
+            # 마지막 저장 봉(장중 값일 수 있음)부터 다시 받아 덮어씀
+            last = conn.execute(
+                "SELECT MAX(date) FROM price_bars WHERE ticker = ?", (ticker,)
+            ).fetchone()[0]
+            try:
+                df_new = yf_history(ticker, start=last)
+                if _has_corporate_action(df_new, last):
+                    # 분할·배당이 생기면 yfinance 가 과거 봉 전체를 다시 수정하므로
+                    # 꼬리만 붙이면 수정 전/후 가격이 섞임 → 저장 구간 전체를 다시 받아 교체
+                    df_new = (yf_history(ticker, period="max") if meta[0] == ''
+                              else yf_history(ticker, start=meta[0]))
+                    if df_new.empty:
+                        raise ValueError("재조회 결과 없음")
+                    conn.execute("DELETE FROM price_bars WHERE ticker = ?", (ticker,))
+                    get_frame_cache().discard(lambda k: k[:2] == ('stock', ticker))
+                _save_bars(conn, ticker, df_new)
+                conn.execute("UPDATE price_meta SET fetched_on = ? WHERE ticker = ?", (today, ticker))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                # 델타 갱신 실패 시 저장된 데이터로 응답
+
+        return _load_bars(conn, ticker, start)
+    finally:
+        conn.close()
+
+
+
+# ── 환율 ──────────────────────────────────────
+# 환율 페이지의 최장 기간(1년)을 심볼당 한 번만 받아 두고 기간별로 잘라서 사용
+FX_MAX_PERIOD = "1y"
+FX_CACHE_TTL  = 600  # 초
+
+
+
+def get_fx_history(symbol: str) -> pd.DataFrame:
+    """심볼별 최장 구간 일봉 (공유 프레임 캐시, 모든 세션 공유)"""
+    return get_frame_cache().get_or_load(
+        ('fx', symbol), FX_CACHE_TTL,
+        lambda: yf_history(symbol, period=FX_MAX_PERIOD), cacheable=_has_rows,
+    )
+
+
+
+def slice_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """캐시된 전체 구간에서 period 만큼만 잘라냄 (추가 다운로드 없음)"""
+    start = _period_start(period)
+    if df.empty or start is None:
+        return df
+    if df.index.tz is not None:
+        start = start.tz_localize(df.index.tz)
+    return df[df.index >= start]
+
+
+
+def get_fx_data(symbol: str, period: str = "3mo") -> pd.DataFrame:
+    return slice_period(get_fx_history(symbol), period)
+
+
+
+# ── 추천 카드용 미니 차트 데이터 ──────────────────
+def get_mini_chart_data(tickers: list, period: str = "1mo") -> dict:
+    """
+    카드에 들어갈 전 종목(국내 .KS/.KQ + 미국)을 yf.download 한 번으로 받아 종목별로 분리
+    종목별 프레임은 공유 캐시에 두고, 캐시에 없는 종목만 모아서 다운로드
+    반환: {ticker: DataFrame} (데이터 없는 종목은 제외)
+    """
+    cache = get_frame_cache()
+    result, missing = {}, []
+    for t in dict.fromkeys(t for t in tickers if t):
+        df = cache.get(('mini', t, period))
+        if df is None:
+            missing.append(t)
+        else:
+            result[t] = df
+    if not missing:
+        return result
+
+    tickers = missing
+    try:
+        raw = upstream_call(
+            'yfinance', ('download', tuple(sorted(tickers)), period),
+            lambda: yf.download(tickers, period=period, group_by='ticker',
+                                threads=True, progress=False, auto_adjust=True),
+            accept=lambda df: df is not None and not df.empty,
+        )
+    except Exception:
+        return result
+    if raw is None or raw.empty:
+        return result
+
+    for t in tickers:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if t not in raw.columns.get_level_values(0):
+                continue
+            df = raw[t]
+        else:
+            df = raw  # 단일 종목 요청 시 평평한 컬럼으로 올 수 있음
+        df = df.dropna(subset=['Close'])
+        if not df.empty:
+            cache.put(('mini', t, period), df, MINI_CHART_CACHE_TTL)
+            result[t] = df
+    return result
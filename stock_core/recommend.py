@@ -0,0 +1,210 @@
+"""추천 종목: AI 응답 검증(StockPick), 거래일별 추천 스냅샷 저장·조회"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from .concurrency import coalesce
+from .lazy import lazy_import
+from .llm import RECOMMEND_GENERATION_CONFIG, build_text_prompt, generate_text, get_llm_provider
+from .prices import get_mini_chart_data
+from .symbols import _stock_db_conn, search_kr_stocks
+
+pd = lazy_import("pandas")
+
+
+logger = logging.getLogger(__name__)
+
+
+KR_REPAIR_MIN_SCORE = 80   # 국내 티커 보정은 종목명 완전일치(100)·접두일치(80) 결과만 사용
+
+
+
+@dataclass(frozen=True)
+class StockPick:
+    """추천 카드 1장 분량의 종목 정보 (기본 목록·AI 추천 공용)"""
+    flag:   str
+    name:   str
+    ticker: str
+    desc:   str
+    reason: str
+    risk:   str
+    stars:  str
+
+
+    @classmethod
+    def from_ai(cls, d: dict) -> 'StockPick':
+        """스키마 응답 항목 검증 → StockPick. 형식이 어긋나면 ValueError"""
+        market = str(d.get('market', '')).strip().upper()
+        if market not in ('KR', 'US'):
+            raise ValueError(f"알 수 없는 시장: {market!r}")
+        texts = {k: str(d.get(k) or '').strip() for k in ('name', 'ticker', 'summary', 'reason', 'risk')}
+        missing = [k for k, v in texts.items() if not v]
+        if missing:
+            raise ValueError(f"빈 항목: {missing}")
+
+
+        ticker = texts['ticker'].upper()
+        if market == 'KR' and not re.fullmatch(r'\d{6}\.K[SQ]', ticker):
+            # 코드만 오거나 형식이 틀린 경우 로컬 종목 DB로 보정 — 이름이 확실히 일치할 때만
+            # (부분·오타 일치로 고르면 카드 이름과 다른 회사의 차트가 붙음 → 항목을 버림)
+            found = search_kr_stocks(texts['name'], limit=1)
+            if not found or found[0][3] < KR_REPAIR_MIN_SCORE:
+                raise ValueError(f"국내 티커 형식 오류: {ticker}")
+            ticker = found[0][0]
+        difficulty = min(max(int(d.get('difficulty') or 1), 1), 5)
+
+
+        return cls(
+            flag='🇰🇷' if market == 'KR' else '🇺🇸',
+            name=texts['name'], ticker=ticker,
+            desc=texts['summary'], reason=texts['reason'], risk=texts['risk'],
+            stars='⭐' * difficulty,
+        )
+
+
+
+def parse_recommendations(raw: str) -> dict:
+    """JSON 응답 → {'beginner': [StockPick, ...], 'expert': [...]}  (잘못된 항목은 건너뜀)"""
+    data = json.loads(raw)
+    result = {}
+    for level in ('beginner', 'expert'):
+        picks = []
+        for item in data.get(level) or []:
+            try:
+                picks.append(StockPick.from_ai(item))
+            except (ValueError, TypeError) as e:
+                logger.warning("추천 항목 무시 (%s): %s", level, e)
+        if not picks:
+            raise ValueError(f"'{level}' 추천 목록이 비어 있습니다.")
+        result[level] = picks
+    return result
+
+
+
+# ── 거래일별 추천 스냅샷 (배치로 하루 1회 생성 → 페이지는 읽기만) ──
+MARKET_TZ = ZoneInfo("Asia/Seoul")
+
+
+
+def current_trading_day() -> str:
+    """오늘(한국 시간) 기준 가장 최근 평일 'YYYY-MM-DD' (주말이면 직전 금요일)"""
+    day = datetime.now(MARKET_TZ).date()
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+
+def _snapshot_conn():
+    conn = _stock_db_conn()
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS rec_snapshots ("
+        "trading_day TEXT PRIMARY KEY, created_at REAL, payload TEXT)"
+    )
+    return conn
+
+
+
+def save_recommendation_snapshot(snapshot: dict):
+    payload = {
+        'beginner': [asdict(p) for p in snapshot['beginner']],
+        'expert':   [asdict(p) for p in snapshot['expert']],
+        'charts': {
+            t: {'dates': [d.strftime('%Y-%m-%d') for d in df.index], 'close': df['Close'].round(4).tolist()}
+            for t, df in snapshot['charts'].items()
+        },
+    }
+    conn = _snapshot_conn()
+    try:
+        conn.execute("INSERT OR REPLACE INTO rec_snapshots VALUES (?, ?, ?)",
+                     (snapshot['trading_day'], snapshot['created_at'], json.dumps(payload, ensure_ascii=False)))
+    finally:
+        conn.close()
+
+
+
+def load_recommendation_snapshot():
+    """가장 최근 스냅샷 → {'trading_day', 'created_at', 'beginner', 'expert', 'charts'} (없으면 None)"""
+    conn = _snapshot_conn()
+    try:
+        row = conn.execute(
+            "SELECT trading_day, created_at, payload FROM rec_snapshots ORDER BY trading_day DESC LIMIT 1"
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    payload = json.loads(row[2])
+    return {
+        'trading_day': row[0],
+        'created_at':  row[1],
+        'beginner':    [StockPick(**d) for d in payload['beginner']],
+        'expert':      [StockPick(**d) for d in payload['expert']],
+        'charts': {
+            t: pd.DataFrame({'Close': c['close']}, index=pd.to_datetime(c['dates']))
+            for t, c in payload['charts'].items()
+        },
+    }
+
+
+
+def build_recommendation_snapshot(force: bool = False) -> dict:
+    """초보자·고수 추천(LLM 1회) + 카드 미니 차트 데이터(일괄 조회 1회)를 만들어 저장"""
+    trading_day = current_trading_day()
+    prompt = build_text_prompt("recommend", trading_day)
+    # JSON 이 깨졌거나 목록이 비는 응답은 캐시에 남기지 않음 → 다음 재시도가 같은 응답을 다시 읽지 않음
+    raw = generate_text(get_llm_provider(), prompt, 'recommend', RECOMMEND_GENERATION_CONFIG,
+                        refresh=force, validate=parse_recommendations)
+    recs = parse_recommendations(raw)
+    snapshot = {
+        'trading_day': trading_day,
+        'created_at':  time.time(),
+        'beginner':    recs['beginner'],
+        'expert':      recs['expert'],
+        'charts':      get_mini_chart_data([p.ticker for p in recs['beginner'] + recs['expert']]),
+    }
+    save_recommendation_snapshot(snapshot)
+    logger.info("추천 스냅샷 저장: %s (%d + %d 종목)",
+                snapshot['trading_day'], len(recs['beginner']), len(recs['expert']))
+    return snapshot
+
+
+
+# 자동 생성이 실패하면 이 시간(초) 동안은 다시 시도하지 않음 — 매 rerun 마다 LLM 호출·재시도 방지
+REC_RETRY_AFTER = 300
+_last_failure = None   # (time.monotonic(), 예외)
+
+
+
+def get_recommendation_snapshot() -> dict:
+    """
+    저장된 스냅샷을 바로 반환하고, 없거나 지난 거래일 것이면 (프로세스당 한 번만) 새로 생성
+    생성 실패는 REC_RETRY_AFTER 동안 기억해 두고 그 사이에는 이전 스냅샷(없으면 같은 예외)으로 응답
+    """
+    global _last_failure
+    snapshot = load_recommendation_snapshot()
+    today = current_trading_day()
+    if snapshot is not None and snapshot['trading_day'] >= today:
+        return snapshot
+
+    failure = _last_failure
+    if failure is not None and time.monotonic() - failure[0] < REC_RETRY_AFTER:
+        if snapshot is None:
+            raise failure[1]
+        return snapshot
+    try:
+        snapshot = coalesce(('rec_snapshot', today), build_recommendation_snapshot)
+        _last_failure = None
+        return snapshot
+    except Exception as e:
+        _last_failure = (time.monotonic(), e)
+        if snapshot is None:
+            raise
+        logger.exception("추천 스냅샷 갱신 실패, 이전 스냅샷 사용")
+        return snapshot
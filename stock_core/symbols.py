@@ -0,0 +1,617 @@
+"""종목 검색: 시장 자동 감지, 국내 종목 DB·검색 인덱스, 미국 종목 마스터"""
+from __future__ import annotations
+
+import bisect
+import difflib
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+
+from .cache import resource_cache
+from .config import BUNDLED_DIR, data_path
+from .lazy import lazy_import
+from .upstream import get_upstream, upstream_call
+
+fdr = lazy_import("FinanceDataReader")
+pd = lazy_import("pandas")
+yf = lazy_import("yfinance")
+
+
+logger = logging.getLogger(__name__)
+
+
+
+# ── 시장 자동 감지 ──────────────────────────────
+def detect_market(query: str):
+    query = query.strip()
+    if re.fullmatch(r'[A-Z]{1,5}', query):
+        return 'US_TICKER', query.upper()
+    if re.fullmatch(r'[a-zA-Z\s\.\-&]+', query):
+        return 'US_NAME', query
+    return 'KR', query
+
+
+
+# ── 국내 주식 DB ───────────────────────────────
+# 실행 중 갱신되는 종목 DB (KRX·미국 목록, 갱신 기록, 추천 스냅샷) — git 미추적
+STOCK_DB_PATH = data_path("stock_data.db")
+# 저장소에 포함된 초기 KRX 목록: 직접 열지 않고, 실행용 DB 가 없을 때 한 번 복사해서 씀
+STOCK_DB_SEED = os.path.join(BUNDLED_DIR, "stocks.db")
+_seed_lock = threading.Lock()
+
+
+
+KRX_REFRESH_INTERVAL = 24 * 3600   # 종목 목록 갱신 주기 (초)
+KRX_REFRESH_CHECK    = 3600        # 스케줄러가 갱신 필요 여부를 확인하는 간격 (초)
+KRX_MIN_KEEP_RATIO   = 0.5         # 새 목록이 기존 대비 이 비율보다 작으면 교체 거부 (불완전 응답 방어)
+
+
+
+def _ensure_stock_db():
+    """실행용 DB 가 없으면 초기 목록(stocks.db)을 복사 — 임시 파일에 복사 후 교체해 반쯤 쓴 파일을 열지 않음"""
+    if os.path.exists(STOCK_DB_PATH):
+        return
+    with _seed_lock:
+        if os.path.exists(STOCK_DB_PATH) or not os.path.exists(STOCK_DB_SEED):
+            return
+        tmp_path = f"{STOCK_DB_PATH}.{os.getpid()}.tmp"
+        shutil.copyfile(STOCK_DB_SEED, tmp_path)
+        os.replace(tmp_path, STOCK_DB_PATH)
+
+
+
+def _stock_db_conn():
+    _ensure_stock_db()
+    conn = sqlite3.connect(STOCK_DB_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS db_meta (key TEXT PRIMARY KEY, value TEXT)")
+    return conn
+
+
+
+def _has_stock_table(conn) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='stock_info'"
+    ).fetchone() is not None
+
+
+
+def refresh_krx_listing(df_krx: pd.DataFrame = None) -> dict:
+    """
+    KRX 상장 목록을 staging 테이블에 벌크 적재 → 현재 stock_info 와 비교 → 한 트랜잭션으로 교체
+    WAL 모드라 교체 중에도 기존 테이블 조회는 막히지 않음
+    반환: {'total', 'added', 'removed', 'changed'}  (changed = 이름·시장 변경)
+    """
+    if df_krx is None:
+        # 목록은 DB 자체가 마지막 정상본이므로 응답을 기억하지 않음 (key=None)
+        df_krx = get_upstream('krx').call(None, fdr.StockListing, 'KRX',
+                                          accept=lambda df: df is not None and not df.empty)
+    marcap = df_krx['Marcap'] if 'Marcap' in df_krx.columns else pd.Series(0, index=df_krx.index)
+    rows = list(zip(df_krx['Code'], df_krx['Name'], df_krx['Market'], marcap.fillna(0).astype(float)))
+
+
+    conn = _stock_db_conn()
+    try:
+        conn.execute("DROP TABLE IF EXISTS stock_info_staging")
+        conn.execute(
+            "CREATE TABLE stock_info_staging (code TEXT PRIMARY KEY, name TEXT, market TEXT, marcap REAL)"
+        )
+        conn.execute("BEGIN")
+        conn.executemany("INSERT OR REPLACE INTO stock_info_staging VALUES (?, ?, ?, ?)", rows)
+        conn.execute("COMMIT")
+        total = conn.execute("SELECT COUNT(*) FROM stock_info_staging").fetchone()[0]
+
+
+        if _has_stock_table(conn):
+            live = conn.execute("SELECT COUNT(*) FROM stock_info").fetchone()[0]
+            if total < live * KRX_MIN_KEEP_RATIO:
+                conn.execute("DROP TABLE stock_info_staging")
+                raise ValueError(f"KRX 목록이 비정상적으로 작습니다 ({total} < {live})")
+            added = conn.execute(
+                "SELECT COUNT(*) FROM stock_info_staging s "
+                "WHERE NOT EXISTS (SELECT 1 FROM stock_info l WHERE l.code = s.code)"
+            ).fetchone()[0]
+            removed = conn.execute(
+                "SELECT COUNT(*) FROM stock_info l "
+                "WHERE NOT EXISTS (SELECT 1 FROM stock_info_staging s WHERE s.code = l.code)"
+            ).fetchone()[0]
+            changed = conn.execute(
+                "SELECT COUNT(*) FROM stock_info_staging s JOIN stock_info l ON l.code = s.code "
+                "WHERE l.name IS NOT s.name OR l.market IS NOT s.market"
+            ).fetchone()[0]
+        else:
+            added, removed, changed = total, 0, 0
+
+
+        stats = {'total': total, 'added': added, 'removed': removed, 'changed': changed}
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DROP TABLE IF EXISTS stock_info")
+        conn.execute("ALTER TABLE stock_info_staging RENAME TO stock_info")
+        conn.execute("INSERT OR REPLACE INTO db_meta VALUES ('krx_refreshed_at', ?)", (str(time.time()),))
+        conn.execute("INSERT OR REPLACE INTO db_meta VALUES ('krx_refresh_stats', ?)", (json.dumps(stats),))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+    load_kr_stock_index.clear()  # 다음 검색부터 새 목록으로 인덱스 재구성
+    logger.info("KRX 종목 목록 갱신: %s", stats)
+    return stats
+
+
+
+def get_krx_refresh_info():
+    """(마지막 갱신 시각 epoch, 통계 dict) — 기록이 없으면 (None, None)"""
+    conn = _stock_db_conn()
+    try:
+        meta = dict(conn.execute(
+            "SELECT key, value FROM db_meta WHERE key IN ('krx_refreshed_at', 'krx_refresh_stats')"
+        ).fetchall())
+    finally:
+        conn.close()
+    if 'krx_refreshed_at' not in meta:
+        return None, None
+    return float(meta['krx_refreshed_at']), json.loads(meta.get('krx_refresh_stats') or '{}')
+
+
+
+def _start_refresh_thread(name: str, get_info, refresh, interval: float):
+    """get_info() 의 마지막 갱신 시각이 interval 보다 오래되면 refresh() — 데몬 스레드로 반복 확인"""
+    def loop():
+        while True:
+            try:
+                refreshed_at, _ = get_info()
+                if refreshed_at is None or time.time() - refreshed_at >= interval:
+                    refresh()
+            except Exception:
+                logger.exception("%s: 종목 목록 갱신 실패", name)
+            time.sleep(KRX_REFRESH_CHECK)
+
+
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+
+@resource_cache
+def start_krx_refresh_scheduler():
+    """프로세스당 1개의 데몬 스레드가 주기적으로 목록을 갱신 (검색은 기존 인덱스로 계속 응답)"""
+    return _start_refresh_thread("krx-refresh", get_krx_refresh_info, refresh_krx_listing, KRX_REFRESH_INTERVAL)
+
+
+
+def krx_listing_ready() -> bool:
+    conn = _stock_db_conn()
+    try:
+        return _has_stock_table(conn)
+    finally:
+        conn.close()
+
+
+
+def initialize_database():
+    """
+    stock_info 가 없으면 최초 1회 동기 구축 (반환: 구축 통계, 이미 있으면 None)
+    이후 갱신은 백그라운드 스케줄러가 담당
+    """
+    stats = None
+    if not krx_listing_ready():
+        logger.info("국내 종목 DB 최초 구축")
+        stats = refresh_krx_listing()
+    start_krx_refresh_scheduler()
+    return stats
+
+
+
+# ── 종목명 검색 인덱스 (프로세스 전역, 메모리 상주) ──────────
+CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+FUZZY_MIN_RATIO    = 0.6   # 오타 허용 유사도 하한 (후보 목록에 올리는 기준)
+FUZZY_ACCEPT_RATIO = 0.8   # 검색어 하나로 종목을 바로 확정할 때의 유사도 하한
+FUZZY_ACCEPT_LEAD  = 0.1   # 그때 1위가 2위보다 이만큼 이상 앞서야 함 (유사도 기준)
+FUZZY_SCORE        = 40    # 오타 허용 점수 = 유사도 × FUZZY_SCORE (다른 일치 유형보다 항상 낮음)
+
+
+
+def to_chosung(text: str) -> str:
+    """'삼성전자' → 'ㅅㅅㅈㅈ' (한글 음절만 초성으로 치환)"""
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        out.append(CHOSUNG[code // 588] if 0 <= code < 11172 else ch)
+    return ''.join(out)
+
+
+
+def _normalize_kr(text: str) -> str:
+    return re.sub(r'\s+', '', text).lower()
+
+
+
+def _bigrams(text: str) -> set:
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+
+
+class KrStockIndex:
+    """
+    stock_info 전체를 메모리에 올린 검색 인덱스
+    점수: 완전일치 100 > 접두 80 > 부분일치 60 > 초성 접두 55 > 초성 부분 50 > 오타 허용(유사도×40)
+    동점이면 시가총액 큰 순, 이름 짧은 순
+    """
+
+    def __init__(self, rows):
+        # rows: [(code, name, market, marcap), ...]
+        self.rows = rows
+        self.names = [_normalize_kr(r[1]) for r in rows]
+        self.chosungs = [to_chosung(n) for n in self.names]
+        self.exact = {}
+        self.bigram_index = {}
+        for i, n in enumerate(self.names):
+            self.exact.setdefault(n, []).append(i)
+            for bg in _bigrams(n):
+                self.bigram_index.setdefault(bg, []).append(i)
+        # 부분일치는 이름을 '\n'으로 이어 붙인 문자열에서 str.find 로 찾음 (파이썬 루프 없이 C 속도)
+        self.name_blob, self.name_offsets = self._join(self.names)
+        self.chosung_blob, self.chosung_offsets = self._join(self.chosungs)
+
+
+    @staticmethod
+    def _join(texts):
+        offsets, pos = [], 0
+        for t in texts:
+            offsets.append(pos)
+            pos += len(t) + 1
+        return '\n'.join(texts), offsets
+
+
+    @staticmethod
+    def _find_all(q, blob, offsets):
+        """q 를 포함하는 항목 → {index: 접두 여부}"""
+        hits = {}
+        pos = blob.find(q)
+        while pos != -1:
+            i = bisect.bisect_right(offsets, pos) - 1
+            hits.setdefault(i, pos == offsets[i])
+            pos = blob.find(q, pos + 1)
+        return hits
+
+
+    def search(self, query: str, limit: int = 10) -> list:
+        q = _normalize_kr(query)
+        if not q:
+            return []
+        scores = {i: 100 for i in self.exact.get(q, [])}
+
+
+        if all(ch in CHOSUNG for ch in q):
+            # 초성만 입력한 경우 ('ㅅㅅㅈㅈ')
+            for i, is_prefix in self._find_all(q, self.chosung_blob, self.chosung_offsets).items():
+                scores.setdefault(i, 55 if is_prefix else 50)
+        else:
+            for i, is_prefix in self._find_all(q, self.name_blob, self.name_offsets).items():
+                scores.setdefault(i, 80 if is_prefix else 60)
+
+
+        if not scores:
+            # 오타·부분 이름: 바이그램을 공유하는 후보만 편집 유사도로 채점
+            candidates = set()
+            for bg in _bigrams(q):
+                candidates.update(self.bigram_index.get(bg, ()))
+            for i in candidates:
+                ratio = difflib.SequenceMatcher(None, q, self.names[i]).ratio()
+                if ratio >= FUZZY_MIN_RATIO:
+                    scores[i] = FUZZY_SCORE * ratio
+
+
+        ranked = sorted(scores, key=lambda i: (-scores[i], -self.rows[i][3], len(self.names[i])))
+        results = []
+        for i in ranked[:limit]:
+            code, name, market, _ = self.rows[i]
+            ticker = code + (".KS" if market == 'KOSPI' else ".KQ")
+            results.append((ticker, name, market, scores[i]))
+        return results
+
+
+
+@resource_cache
+def load_kr_stock_index() -> KrStockIndex:
+    initialize_database()
+    conn = _stock_db_conn()
+    try:
+        try:
+            rows = conn.execute("SELECT code, name, market, COALESCE(marcap, 0) FROM stock_info").fetchall()
+        except sqlite3.OperationalError:
+            # 시가총액 컬럼이 없는 구버전 DB
+            rows = [r + (0,) for r in conn.execute("SELECT code, name, market FROM stock_info").fetchall()]
+    finally:
+        conn.close()
+    return KrStockIndex(rows)
+
+
+
+def search_kr_stocks(query: str, limit: int = 10) -> list:
+    """순위가 매겨진 후보 목록: [(ticker, name, market, score), ...]"""
+    try:
+        return load_kr_stock_index().search(query, limit)
+    except Exception:
+        return []
+
+
+
+def get_ticker_from_db(stock_name: str):
+    """
+    검색어 → (티커, 종목명). 이름 일치(완전·접두·부분·초성)는 1위를 그대로 사용하고,
+    오타 허용 결과는 유사도가 충분히 높고 2위와 차이가 뚜렷할 때만 확정 (아니면 (None, None))
+    """
+    results = search_kr_stocks(stock_name, limit=2)
+    if not results:
+        return None, None
+    ticker, name, _, score = results[0]
+    if score < FUZZY_SCORE:
+        runner_up = results[1][3] if len(results) > 1 else 0
+        if score < FUZZY_ACCEPT_RATIO * FUZZY_SCORE or score - runner_up < FUZZY_ACCEPT_LEAD * FUZZY_SCORE:
+            return None, None
+    return ticker, name
+
+
+
+# ── 미국 주식 검색 ──────────────────────────────
+# NASDAQ Trader 심볼 디렉터리 (NASDAQ 상장 + NYSE/AMEX/ARCA 등 기타 거래소, 매일 갱신되는 '|' 구분 파일)
+US_LISTING_URLS = {
+    'nasdaq': "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt",
+    'other':  "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt",
+}
+US_EXCHANGE_CODES = {'A': 'AMEX', 'N': 'NYSE', 'P': 'NYSE ARCA', 'Z': 'BATS', 'V': 'IEX'}
+# 이름 검색 시 뒤로 밀리는 파생 증권 키워드
+US_DERIVATIVE_WORDS = {'warrant', 'warrants', 'right', 'rights', 'unit', 'units',
+                       'preferred', 'depositary', 'notes', 'debentures'}
+
+
+
+def _clean_us_name(security_name: str) -> str:
+    """'Apple Inc. - Common Stock' → 'Apple Inc.'"""
+    name = security_name.split(' - ')[0]
+    name = re.sub(r'\s+(Common Stock|Ordinary Shares|Common Shares)$', '', name)
+    return name.strip()
+
+
+
+def _name_tokens(name: str) -> tuple:
+    return tuple(t for t in re.split(r'[^a-z0-9]+', name.lower()) if t)
+
+
+
+US_REFRESH_INTERVAL = 24 * 3600   # 상장 목록 갱신 주기 (초) — 상장폐지 종목이 마스터에 남지 않도록
+US_RETRY_AFTER      = 600         # 최초 구축 실패 후 재시도까지 대기 (초), 그동안은 온라인 검색으로 대체
+_us_failed_at = None
+
+
+
+def us_master_ready() -> bool:
+    conn = _stock_db_conn()
+    try:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='us_stock_info'"
+        ).fetchone() is not None
+    finally:
+        conn.close()
+
+
+
+def _read_us_listing(url: str) -> pd.DataFrame:
+    """'|' 구분 심볼 파일 다운로드 ('nasdaq' 업스트림 관문, 목록은 DB 가 마지막 정상본이라 응답은 기억하지 않음)"""
+    return get_upstream('nasdaq').call(None, pd.read_csv, url, sep='|', dtype=str,
+                                       accept=lambda df: df is not None and not df.empty)
+
+
+
+def _download_us_listing() -> list:
+    """NASDAQ Trader 심볼 디렉터리 → [(symbol, name, exchange, quote_type), ...]"""
+    rows = []
+    nasdaq = _read_us_listing(US_LISTING_URLS['nasdaq'])
+    nasdaq = nasdaq[nasdaq['Test Issue'] == 'N']
+    for _, r in nasdaq.iterrows():
+        rows.append((r['Symbol'], _clean_us_name(r['Security Name']), 'NASDAQ',
+                     'ETF' if r['ETF'] == 'Y' else 'EQUITY'))
+    other = _read_us_listing(US_LISTING_URLS['other'])
+    other = other[other['Test Issue'] == 'N']
+    for _, r in other.iterrows():
+        # yfinance 표기: BRK.B → BRK-B
+        rows.append((r['ACT Symbol'].replace('.', '-'), _clean_us_name(r['Security Name']),
+                     US_EXCHANGE_CODES.get(r['Exchange'], r['Exchange']),
+                     'ETF' if r['ETF'] == 'Y' else 'EQUITY'))
+    return rows
+
+
+
+def refresh_us_listing() -> dict:
+    """
+    미국 상장 목록을 staging 테이블에 적재 → us_stock_info 와 한 트랜잭션으로 교체 (KRX 갱신과 같은 방식)
+    반환: {'total', 'added', 'removed'}
+    """
+    rows = _download_us_listing()
+    conn = _stock_db_conn()
+    try:
+        conn.execute("DROP TABLE IF EXISTS us_stock_info_staging")
+        conn.execute(
+            "CREATE TABLE us_stock_info_staging "
+            "(symbol TEXT PRIMARY KEY, name TEXT, exchange TEXT, quote_type TEXT)"
+        )
+        conn.execute("BEGIN")
+        conn.executemany("INSERT OR REPLACE INTO us_stock_info_staging VALUES (?, ?, ?, ?)", rows)
+        conn.execute("COMMIT")
+        total = conn.execute("SELECT COUNT(*) FROM us_stock_info_staging").fetchone()[0]
+
+
+        if us_master_ready():
+            live = conn.execute("SELECT COUNT(*) FROM us_stock_info").fetchone()[0]
+            if total < live * KRX_MIN_KEEP_RATIO:
+                conn.execute("DROP TABLE us_stock_info_staging")
+                raise ValueError(f"미국 상장 목록이 비정상적으로 작습니다 ({total} < {live})")
+            added = conn.execute(
+                "SELECT COUNT(*) FROM us_stock_info_staging s "
+                "WHERE NOT EXISTS (SELECT 1 FROM us_stock_info l WHERE l.symbol = s.symbol)"
+            ).fetchone()[0]
+            removed = conn.execute(
+                "SELECT COUNT(*) FROM us_stock_info l "
+                "WHERE NOT EXISTS (SELECT 1 FROM us_stock_info_staging s WHERE s.symbol = l.symbol)"
+            ).fetchone()[0]
+        else:
+            added, removed = total, 0
+
+
+        stats = {'total': total, 'added': added, 'removed': removed}
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DROP TABLE IF EXISTS us_stock_info")
+        conn.execute("ALTER TABLE us_stock_info_staging RENAME TO us_stock_info")
+        conn.execute("INSERT OR REPLACE INTO db_meta VALUES ('us_refreshed_at', ?)", (str(time.time()),))
+        conn.execute("INSERT OR REPLACE INTO db_meta VALUES ('us_refresh_stats', ?)", (json.dumps(stats),))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+    _us_symbol_index.clear()  # 다음 조회부터 새 목록 사용
+    logger.info("미국 종목 마스터 갱신: %s", stats)
+    return stats
+
+
+
+def get_us_refresh_info():
+    """(마지막 갱신 시각 epoch, 통계 dict) — 기록이 없으면 (None, None)"""
+    conn = _stock_db_conn()
+    try:
+        meta = dict(conn.execute(
+            "SELECT key, value FROM db_meta WHERE key IN ('us_refreshed_at', 'us_refresh_stats')"
+        ).fetchall())
+    finally:
+        conn.close()
+    if 'us_refreshed_at' not in meta:
+        return None, None
+    return float(meta['us_refreshed_at']), json.loads(meta.get('us_refresh_stats') or '{}')
+
+
+
+@resource_cache
+def start_us_refresh_scheduler():
+    return _start_refresh_thread("us-refresh", get_us_refresh_info, refresh_us_listing, US_REFRESH_INTERVAL)
+
+
+
+def initialize_us_database():
+    """
+    us_stock_info 가 없으면 최초 1회 벌크 파일로 생성 (실패 시 US_RETRY_AFTER 동안은 다시 받지 않음)
+    이후 갱신은 백그라운드 스케줄러가 담당
+    """
+    global _us_failed_at
+    if not us_master_ready() and (_us_failed_at is None or time.monotonic() - _us_failed_at >= US_RETRY_AFTER):
+        logger.info("미국 종목 마스터 최초 구축")
+        try:
+            refresh_us_listing()
+            _us_failed_at = None
+        except Exception:
+            _us_failed_at = time.monotonic()
+            logger.exception("미국 종목 마스터 생성 실패 (온라인 검색으로 대체)")
+    start_us_refresh_scheduler()
+
+
+
+@resource_cache
+def _us_symbol_index():
+    """us_stock_info → 메모리 인덱스 (테이블이 없으면 sqlite3.OperationalError, 캐시되지 않음)"""
+    conn = _stock_db_conn()
+    try:
+        rows = conn.execute("SELECT symbol, name, exchange, quote_type FROM us_stock_info").fetchall()
+    finally:
+        conn.close()
+    symbols = {r[0]: (r[1], r[2], r[3]) for r in rows}
+    names = [(_name_tokens(r[1]), r[0]) for r in rows]
+    return symbols, names
+
+
+
+def load_us_symbol_master():
+    """
+    프로세스 전역 메모리 인덱스
+    반환: (symbols {symbol: (name, exchange, quote_type)}, names [(tokens, symbol), ...])
+    마스터를 아직 못 만들었으면 빈 인덱스 (캐시하지 않으므로 구축되면 다음 호출부터 사용)
+    """
+    try:
+        index = _us_symbol_index()
+        start_us_refresh_scheduler()
+        return index
+    except sqlite3.OperationalError:
+        pass
+    initialize_us_database()
+    try:
+        return _us_symbol_index()
+    except sqlite3.OperationalError:
+        return {}, []
+
+
+
+def lookup_us_name_local(company_name: str):
+    """회사명 → (티커, 이름). 이름 토큰이 검색어 토큰으로 시작하는 종목 중 가장 짧은 보통주/ETF 우선"""
+    symbols, names = load_us_symbol_master()
+    query = _name_tokens(company_name)
+    if not query:
+        return None, None
+    n = len(query)
+    best = None
+    for tokens, symbol in names:
+        if tokens[:n] != query:
+            continue
+        rank = (bool(US_DERIVATIVE_WORDS & set(tokens)), len(tokens) - n, len(symbol))
+        if best is None or rank < best[0]:
+            best = (rank, symbol)
+    if best is None:
+        return None, None
+    symbol = best[1]
+    return symbol, symbols[symbol][0]
+
+
+
+def get_us_ticker_by_name(company_name: str):
+    ticker, name = lookup_us_name_local(company_name)
+    if ticker:
+        return ticker, name
+    # 로컬 마스터에 없으면 온라인 검색
+    try:
+        quotes = upstream_call('yfinance', ('search', company_name),
+                               lambda: yf.Search(company_name, max_results=5).quotes)
+        if not quotes:
+            return None, None
+        for q in quotes:
+            if q.get('quoteType', '').upper() in ('EQUITY', 'ETF'):
+                return q.get('symbol', ''), q.get('shortname') or q.get('longname') or company_name
+        q = quotes[0]
+        return q.get('symbol', ''), q.get('shortname', company_name)
+    except Exception:
+        return None, None
+
+
+
+def validate_us_ticker(ticker: str):
+    symbols, _ = load_us_symbol_master()
+    if ticker in symbols:
+        return ticker, symbols[ticker][0]
+    # 마스터에 없는 심볼만 네트워크로 확인
+    def probe():
+        stock = yf.Ticker(ticker)
+        info = stock.info
+        return info.get('shortName') or info.get('longName') or ticker, not stock.history(period="5d").empty
+
+
+    try:
+        name, has_prices = upstream_call('yfinance', ('validate', ticker), probe)
+        if not has_prices:
+            return None, None
+        return ticker, name
+    except Exception:
+        return None, None
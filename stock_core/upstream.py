@@ -0,0 +1,248 @@
+"""업스트림 호출 보호 (속도 제한 · 재시도 · 서킷 브레이커, 프로세스 전역)"""
+import logging
+import random
+import threading
+import time
+
+from .cache import resource_cache
+from .concurrency import coalesce
+from .frame_cache import ByteLRUCache
+
+
+logger = logging.getLogger(__name__)
+
+
+# provider: (초당 토큰, 버스트, 재시도 횟수, 연속 실패 임계치, 차단 유지 시간 초)
+UPSTREAM_LIMITS = {
+    'yfinance': (4.0, 8, 3, 5, 60),
+    'ddgs':     (1.0, 3, 2, 4, 120),
+    'gemini':   (1.0, 4, 2, 5, 60),
+    'youtube':  (0.5, 2, 1, 3, 300),
+    # 종목 목록 벌크 다운로드 (FinanceDataReader KRX 목록 · NASDAQ Trader 심볼 디렉터리)
+    'krx':      (0.2, 1, 2, 3, 600),
+    'nasdaq':   (0.2, 2, 2, 3, 600),
+}
+RETRY_BASE_DELAY     = 0.5   # 초, 재시도마다 2배 (full jitter)
+RETRY_MAX_DELAY      = 8.0
+THROTTLE_MAX_WAIT    = 30.0  # 토큰 대기 한도 (초), 넘으면 호출하지 않고 대체값으로
+LAST_GOOD_MAX_BYTES  = 16 * 1024 * 1024   # provider 별 마지막 정상 응답 보관 상한 (바이트, LRU)
+LAST_GOOD_TTL        = 24 * 3600          # 장애 시 대체값으로 쓸 수 있는 최대 경과 시간 (초)
+_MISSING = object()
+
+
+
+class UpstreamUnavailable(Exception):
+    """서킷이 열려 있거나 대기 한도를 넘었고, 대신 돌려줄 이전 응답도 없음"""
+
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate    = rate
+        self.burst   = burst
+        self._tokens = float(burst)
+        self._stamp  = time.monotonic()
+        self._lock   = threading.Lock()
+
+
+    def acquire(self, max_wait: float):
+        """
+        토큰 하나를 가져감. 반환: 기다린 시간(초)
+        max_wait 안에 토큰이 생기지 않으면 None (토큰은 소비하지 않음)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            wait_for = max(0.0, (1 - self._tokens) / self.rate)
+            if wait_for > max_wait:
+                return None
+            self._tokens -= 1  # 음수면 뒤에 오는 호출이 그만큼 더 기다림
+        if wait_for:
+            time.sleep(wait_for)
+        return wait_for
+
+
+
+class CircuitBreaker:
+    """연속 실패가 임계치에 닿으면 reset_after 초 동안 차단, 이후 한 번 시험 호출(half-open)"""
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold   = threshold
+        self.reset_after = reset_after
+        self.failures    = 0
+        self.opened_at   = None
+        self._probing    = False
+        self._lock       = threading.Lock()
+
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return 'half_open'
+        return 'open'
+
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+
+    def release(self):
+        """결과 없이 끝난 시험 호출 자리를 반납 (상태는 그대로)"""
+        with self._lock:
+            self._probing = False
+
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.failures, self.opened_at = 0, None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+
+class UpstreamClient:
+    """
+    provider 하나에 대한 호출 관문
+    토큰 버킷으로 속도 제한 → 실패 시 지터 섞인 지수 백오프 재시도 →
+    연속 실패로 서킷이 열리면 key 별 마지막 정상 응답으로 대체
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, retries: int, threshold: int, reset_after: float):
+        self.name      = name
+        self.retries   = retries
+        self.bucket    = TokenBucket(rate, burst)
+        self.breaker   = CircuitBreaker(threshold, reset_after)
+        self._last     = ByteLRUCache(LAST_GOOD_MAX_BYTES)
+        self._lock     = threading.Lock()
+        self.stats     = {'calls': 0, 'throttled': 0, 'retries': 0, 'failures': 0,
+                          'fallbacks': 0, 'short_circuits': 0}
+
+
+    def _count(self, field: str):
+        with self._lock:
+            self.stats[field] += 1
+
+
+    def _remember(self, key, value):
+        if key is not None:
+            self._last.put(key, value, LAST_GOOD_TTL)
+
+
+    def _fallback(self, key, reason: str, error: Exception = None, default=_MISSING):
+        """key 의 마지막 정상 응답. 없으면 default, default 도 없으면 예외"""
+        value = _MISSING if key is None else self._last.get(key, _MISSING)
+        if value is _MISSING:
+            if default is not _MISSING:
+                return default
+            if error is not None:
+                raise error
+            raise UpstreamUnavailable(f"{self.name}: {reason}")
+        self._count('fallbacks')
+        logger.warning("%s %s → 이전 응답으로 대체 (%s)", self.name, reason, key)
+        return value
+
+
+    def admit(self):
+        """호출 전 관문 (서킷 확인 + 토큰 획득). 스트리밍처럼 call() 로 감쌀 수 없는 호출용"""
+        if not self.breaker.allow():
+            self._count('short_circuits')
+            raise UpstreamUnavailable(f"{self.name}: 서킷 열림")
+        waited = self.bucket.acquire(THROTTLE_MAX_WAIT)
+        if waited is None:
+            self.breaker.release()
+            self._count('short_circuits')
+            raise UpstreamUnavailable(f"{self.name}: 호출 한도 대기 초과")
+        if waited:
+            self._count('throttled')
+        self._count('calls')
+
+
+    def release(self):
+        """admit() 으로 시작한 호출이 결과 없이 끝남 (스트림을 중간에 닫은 경우 등) — 서킷 상태는 그대로"""
+        self.breaker.release()
+
+
+    def report(self, ok: bool):
+        """admit() 으로 시작한 호출의 결과 기록"""
+        if not ok:
+            self._count('failures')
+        self.breaker.record(ok)
+
+
+    def call(self, key, fn, *args, accept=None, **kwargs):
+        """
+        fn(*args, **kwargs) 를 보호된 상태로 실행
+        accept(result) 가 False 면 (예: 빈 DataFrame) 재시도하고, 끝내 비면 이전 응답 또는 그대로 반환
+        key=None 이면 응답을 기억하지 않음 (업로드·임시 파일처럼 재사용할 수 없는 결과)
+        """
+        if not self.breaker.allow():
+            self._count('short_circuits')
+            return self._fallback(key, "서킷 열림")
+
+
+        result, error = None, None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count('retries')
+                time.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+            waited = self.bucket.acquire(THROTTLE_MAX_WAIT)
+            if waited is None:
+                self.breaker.release()
+                self._count('short_circuits')
+                return self._fallback(key, "호출 한도 대기 초과")
+            if waited:
+                self._count('throttled')
+            self._count('calls')
+            try:
+                result, error = fn(*args, **kwargs), None
+            except Exception as e:
+                error = e
+                self._count('failures')
+                continue
+            if accept is None or accept(result):
+                self.breaker.record(True)
+                self._remember(key, result)
+                return result
+
+
+        if error is not None:
+            self.breaker.record(False)
+            logger.warning("%s 호출 실패 (%d회 시도): %s", self.name, self.retries + 1, error)
+            return self._fallback(key, "호출 실패", error)
+        # 응답은 왔지만 계속 비어 있음 → 장애로 보지 않고, 이전 응답이 있으면 그것을 사용
+        self.breaker.record(True)
+        return self._fallback(key, "빈 응답", default=result)
+
+
+    def snapshot(self) -> dict:
+        last = self._last.stats()
+        with self._lock:
+            return {**self.stats, 'state': self.breaker.state,
+                    'cached_keys': last['entries'], 'cached_bytes': last['bytes']}
+
+
+
+@resource_cache
+def get_upstream(provider: str) -> UpstreamClient:
+    return UpstreamClient(provider, *UPSTREAM_LIMITS[provider])
+
+
+
+def upstream_call(provider: str, key, fn, *args, accept=None, **kwargs):
+    """동시 중복 요청은 합치고(single-flight), 실제 호출은 provider 관문을 거쳐 실행"""
+    client = get_upstream(provider)
+    return coalesce((provider, key), client.call, key, fn, *args, accept=accept, **kwargs)